@@ -0,0 +1,76 @@
+"""Benchmark the aggregation of the hourly consumption history of one home.
+
+Reports the time of aggregate_consumption over a full history, the memory
+held by the aggregator and the size of one Consumption object.
+
+    python benchmarks/bench_aggregation.py [hours]
+"""
+import datetime
+import pathlib
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+from custom_components.tibber_data.aggregation import (  # noqa: E402
+    aggregate_consumption,
+)
+from custom_components.tibber_data.consumption_data import (  # noqa: E402
+    Consumption,
+    ConsumptionNode,
+)
+
+
+def make_nodes(hours: int, now: datetime.datetime) -> list[ConsumptionNode]:
+    """Return hourly consumption nodes ending at the hour before now."""
+    end = now.replace(minute=0, second=0, microsecond=0)
+    nodes = []
+    for k in range(hours, 0, -1):
+        ts = end - datetime.timedelta(hours=k)
+        cons = round(0.5 + (k % 24) / 10 + (k % 97) / 100, 3)
+        price = round(1 + (k % 7) / 10, 4)
+        nodes.append(
+            ConsumptionNode(ts.isoformat(), cons, round(cons * price, 4), price)
+        )
+    return nodes
+
+
+def main():
+    """Run the benchmark."""
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 9600
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Europe/Oslo"))
+    now = datetime.datetime(2023, 3, 28, 15, 30, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+    nodes = make_nodes(hours, now)
+
+    best = float("inf")
+    for _ in range(5):
+        start = time.perf_counter()
+        aggregator = aggregate_consumption(nodes, {}, now)
+        aggregator.stats()
+        best = min(best, time.perf_counter() - start)
+
+    tracemalloc.start()
+    aggregator = aggregate_consumption(nodes, {}, now)
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    month_hours = len(aggregator.month_consumption)
+
+    timestamps = [dt_util.parse_datetime(node.start) for node in nodes]
+    tracemalloc.start()
+    objects = [Consumption(ts, 1.0, 1.0, 1.0) for ts in timestamps]
+    per_object, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_object /= len(objects)
+
+    print(f"{hours} hours, {month_hours} hours this month")
+    print(f"aggregate_consumption  {best * 1000:8.1f} ms")
+    print(f"aggregator retained    {retained / 1e3:8.1f} kB")
+    print(f"Consumption            {per_object:8.1f} bytes")
+
+
+if __name__ == "__main__":
+    main()
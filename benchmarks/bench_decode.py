@@ -0,0 +1,92 @@
+"""Benchmark decoding of a full consumption history response.
+
+Compares the stdlib json decoder, keeping the node dicts, with orjson and the
+compact ConsumptionNode tuples kept by the history store.
+
+    python benchmarks/bench_decode.py [hours]
+"""
+import datetime
+import json
+import pathlib
+import sys
+import time
+import tracemalloc
+
+import orjson
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from custom_components.tibber_data.consumption_data import (  # noqa: E402
+    parse_consumption_nodes,
+)
+
+
+def make_response(hours: int) -> bytes:
+    """Return a GraphQL consumption response with the given number of hours."""
+    start = datetime.datetime(2022, 1, 1, tzinfo=datetime.timezone.utc)
+    nodes = []
+    for hour in range(hours):
+        ts = start + datetime.timedelta(hours=hour)
+        cons = round(0.5 + (hour % 24) / 10, 3)
+        price = round(1 + (hour % 7) / 10, 4)
+        nodes.append(
+            {
+                "from": ts.isoformat(),
+                "to": (ts + datetime.timedelta(hours=1)).isoformat(),
+                "consumption": cons,
+                "cost": round(cons * price, 4),
+                "unitPrice": price,
+                "unitPriceVAT": round(price / 5, 4),
+                "consumptionUnit": "kWh",
+                "currency": "NOK",
+            }
+        )
+    data = {"data": {"viewer": {"home": {"consumption": {"nodes": nodes}}}}}
+    return json.dumps(data).encode()
+
+
+def stdlib_dicts(raw: bytes):
+    """Decode with the stdlib and keep the node dicts."""
+    return json.loads(raw)["data"]["viewer"]["home"]["consumption"]["nodes"]
+
+
+def orjson_compact(raw: bytes):
+    """Decode with orjson and keep compact tuples."""
+    nodes = orjson.loads(raw)["data"]["viewer"]["home"]["consumption"]["nodes"]
+    return parse_consumption_nodes(nodes)
+
+
+def measure(func, raw: bytes, repeat: int = 5):
+    """Return best time, peak memory and retained memory of func."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(raw)
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = func(raw)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return best, peak, retained
+
+
+def main():
+    """Run the benchmark."""
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 9600
+    raw = make_response(hours)
+    print(f"{hours} hours, {len(raw) / 1e6:.1f} MB response")
+    for name, func in (
+        ("stdlib json + dicts", stdlib_dicts),
+        ("orjson + tuples", orjson_compact),
+    ):
+        best, peak, retained = measure(func, raw)
+        print(
+            f"{name:22s} {best * 1000:8.1f} ms"
+            f"  peak {peak / 1e6:6.1f} MB  retained {retained / 1e6:6.1f} MB"
+        )
+
+
+if __name__ == "__main__":
+    main()
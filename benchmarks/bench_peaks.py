@@ -0,0 +1,82 @@
+"""Compare the month peak tracker with a rescan of the month.
+
+Feeds random histories around month, year and DST boundaries to
+MonthPeakTracker, first the stored hours and then new hours and corrections
+as they would be fetched. Checks the three highest days against a rescan of
+the month, and reports the time of each.
+
+    python benchmarks/bench_peaks.py [hours]
+"""
+import datetime
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+from custom_components.tibber_data.consumption_data import (  # noqa: E402
+    ConsumptionNode,
+)
+from custom_components.tibber_data.peak_tracker import (  # noqa: E402
+    MonthPeakTracker,
+)
+from tests.common import NOW_TIMES, make_nodes, rescan_peaks  # noqa: E402
+
+
+def run(hours: int) -> bool:
+    """Run the comparison."""
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Europe/Oslo"))
+    rnd = random.Random(1)
+    ok = True
+    for now_time in NOW_TIMES:
+        now = datetime.datetime(*now_time, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+        nodes = make_nodes(hours, now, rnd)
+        stored, fetched = nodes[:-48], nodes[-48:]
+        # Corrections of already stored hours, some lower and some removed
+        fetched += [
+            ConsumptionNode(
+                node.start,
+                round(rnd.uniform(0, 8), 3) if rnd.random() > 0.3 else None,
+                None,
+                None,
+            )
+            for node in rnd.sample(stored[-200:], 20)
+        ]
+
+        tracker = MonthPeakTracker()
+        start = time.perf_counter()
+        tracker.start_month(now, reversed(stored))
+        start_time = time.perf_counter() - start
+        start = time.perf_counter()
+        for node in fetched:
+            tracker.add([node])
+        add_time = (time.perf_counter() - start) / len(fetched)
+
+        final = {node.start: node for node in stored}
+        final.update((node.start, node) for node in fetched)
+        start = time.perf_counter()
+        expected = rescan_peaks(final.values(), now)
+        rescan_time = time.perf_counter() - start
+
+        same = tracker.peaks() == expected
+        ok = ok and same
+        print(
+            f"{now.isoformat():26s} start {start_time * 1e3:7.3f} ms"
+            f"  add {add_time * 1e6:7.2f} us/hour  rescan {rescan_time * 1e3:7.3f} ms"
+            f"  {'ok' if same else 'MISMATCH'}"
+        )
+    return ok
+
+
+def main():
+    """Compare the tracker with a rescan."""
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 9600
+    sys.exit(0 if run(hours) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Compare the rolling aggregator with a full aggregation of the history.
+
+Seeds RollingConsumptionAggregator with random histories around month, year
+and DST boundaries, then updates it with new hours and corrections as they
+would be fetched. Checks the statistics against ConsumptionAggregator on the
+final history, and reports the time of a full aggregation and of an update.
+
+    python benchmarks/bench_rolling.py [hours]
+"""
+import datetime
+import pathlib
+import random
+import sys
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+from custom_components.tibber_data.aggregation import (  # noqa: E402
+    RollingConsumptionAggregator,
+    aggregate_consumption,
+)
+from custom_components.tibber_data.consumption_data import (  # noqa: E402
+    ConsumptionNode,
+)
+from tests.common import NOW_TIMES, make_nodes, same  # noqa: E402
+
+
+def check(hours: int, rnd: random.Random, now: datetime.datetime) -> bool:
+    """Compare the aggregators at now and print the times."""
+    nodes = make_nodes(hours, now, rnd)
+    stored, fetched = nodes[:-48], nodes[-48:]
+    # Corrections of already stored hours, some with consumption removed
+    for node in rnd.sample(stored[-500:], 30):
+        cons = round(rnd.uniform(0, 8), 3) if rnd.random() > 0.2 else None
+        fetched.append(ConsumptionNode(node.start, cons, node.cost, node.unit_price))
+    prices = {
+        (now + datetime.timedelta(hours=k)).isoformat(): round(rnd.uniform(0, 4), 4)
+        for k in range(30)
+    }
+
+    rolling = RollingConsumptionAggregator(now)
+    start = time.perf_counter()
+    rolling.seed(aggregate_consumption(stored, {}, now))
+    seed_time = time.perf_counter() - start
+    start = time.perf_counter()
+    for node in fetched:
+        rolling.update([node])
+        rolling.set_now(now, prices)
+    update_time = (time.perf_counter() - start) / len(fetched)
+
+    final = {node.start: node for node in stored}
+    final.update((node.start, node) for node in fetched)
+    start = time.perf_counter()
+    full = aggregate_consumption(final.values(), prices, now)
+    full_stats = full.stats()
+    full_time = time.perf_counter() - start
+
+    ok = all(
+        getattr(full, attr) == getattr(rolling, attr)
+        for attr in (
+            "month_consumption",
+            "consumption_yesterday_available",
+            "consumption_prev_hour_available",
+            "prices_tomorrow_available",
+        )
+    )
+    rolling_stats = rolling.stats()
+    ok = ok and all(
+        same(value, rolling_stats[key]) for key, value in full_stats.items()
+    )
+    print(
+        f"{now.isoformat():26s} full {full_time * 1e3:7.2f} ms"
+        f"  seed {seed_time * 1e3:7.2f} ms  update {update_time * 1e3:6.3f} ms/hour"
+        f"  {'ok' if ok else 'MISMATCH'}"
+    )
+    return ok
+
+
+def main():
+    """Compare the rolling aggregator with a full aggregation."""
+    hours = int(sys.argv[1]) if len(sys.argv) > 1 else 17000
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Europe/Oslo"))
+    rnd = random.Random(1)
+    ok = True
+    for now_time in NOW_TIMES:
+        now = datetime.datetime(*now_time, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+        ok = check(hours, rnd, now) and ok
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,260 @@
+"""Offline benchmark suite of the Tibber data coordinator and sensors.
+
+Runs the update functions of the coordinator, the price lookup and the sensor
+updates against a synthetic account, and reports the time and the peak
+allocated memory of each. The results can be saved as a baseline and later
+runs compared with it, failing if a case got slower or allocates more than
+the tolerance allows.
+
+    python benchmarks/bench_suite.py --hours 9600 --homes 2 --chargers 3
+    python benchmarks/bench_suite.py --save benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import pathlib
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.util import dt as dt_util  # noqa: E402
+from synthetic import (  # noqa: E402
+    FakeController,
+    FakeSession,
+    FakeTibberHome,
+    SyntheticTibber,
+)
+
+from custom_components.tibber_data import history_fetcher, sensor  # noqa: E402
+from custom_components.tibber_data.backoff import (  # noqa: E402
+    PUBLIC_API,
+    CircuitBreakers,
+)
+from custom_components.tibber_data.const import DOMAIN  # noqa: E402
+from custom_components.tibber_data.data_coordinator import (  # noqa: E402
+    TibberDataCoordinator,
+)
+from custom_components.tibber_data.token_manager import (  # noqa: E402
+    TibberTokenManager,
+)
+
+MIN_MEASURE_TIME = 0.2
+MAX_REPEAT = 200
+
+
+async def _measure(func, repeat: int) -> dict:
+    """Return the best time and the peak allocation of an async function.
+
+    Fast cases are repeated until they have run for MIN_MEASURE_TIME.
+    """
+    best = float("inf")
+    total = 0.0
+    for k in range(MAX_REPEAT):
+        if k >= repeat and total >= MIN_MEASURE_TIME:
+            break
+        start = time.perf_counter()
+        await func()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        total += elapsed
+    tracemalloc.start()
+    await func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"time_ms": round(best * 1000, 3), "peak_kb": round(peak / 1024, 1)}
+
+
+async def _setup(hass, account):
+    """Create a coordinator for each home of the account."""
+    api = FakeController(account)
+    breakers = CircuitBreakers()
+    hass.data[DOMAIN] = {
+        "coordinator": {},
+        "api": api,
+        "circuit_breakers": breakers,
+        "history_fetcher": history_fetcher.HistoryFetcher(
+            hass, api, breakers.get(PUBLIC_API)
+        ),
+    }
+    session = FakeSession(account)
+    token_manager = TibberTokenManager(hass, session, "bench@example.com", "secret")
+    coordinators = []
+    for home in account.homes.values():
+        coordinator = TibberDataCoordinator(
+            hass, FakeTibberHome(home), session, token_manager
+        )
+        hass.data[DOMAIN]["coordinator"][home.home_id] = coordinator
+        coordinators.append(coordinator)
+    return coordinators
+
+
+async def run_suite(args) -> dict:
+    """Run all cases and return their results."""
+    hass = HomeAssistant(tempfile.mkdtemp())
+    hass.config.set_time_zone(args.time_zone)
+    # The sensors are written without an entity platform
+    for logger in ("homeassistant.helpers.entity", "homeassistant.components.sensor"):
+        logging.getLogger(logger).setLevel(logging.ERROR)
+    history_fetcher.BATCH_DELAY = 0
+
+    account = SyntheticTibber(args.hours, args.homes, args.chargers, args.evs)
+    coordinators = await _setup(hass, account)
+    now = dt_util.now()
+    data = [{} for _ in coordinators]
+    results = {}
+
+    async def _all(func_name):
+        await asyncio.gather(
+            *(
+                getattr(coordinator, func_name)(_data, now)
+                for coordinator, _data in zip(coordinators, data, strict=True)
+            )
+        )
+
+    async def _get_data_cold():
+        for coordinator in coordinators:
+            # pylint: disable-next=protected-access
+            coordinator._history._nodes.clear()  # noqa: SLF001
+            # pylint: disable-next=protected-access
+            coordinator._aggregator = None  # noqa: SLF001
+        await _all("_get_data")
+
+    async def _get_data_warm():
+        for coordinator in coordinators:
+            # pylint: disable-next=protected-access
+            coordinator._aggregator_fingerprint = None  # noqa: SLF001
+        await _all("_get_data")
+
+    results["get_data_cold"] = await _measure(_get_data_cold, args.repeat)
+    results["get_data_warm"] = await _measure(_get_data_warm, args.repeat)
+    results["get_data_unchanged"] = await _measure(
+        lambda: _all("_get_data"), args.repeat
+    )
+    results["get_production_data"] = await _measure(
+        lambda: _all("_get_production_data"), args.repeat
+    )
+    results["get_data_tibber"] = await _measure(
+        lambda: _all("_get_data_tibber"), args.repeat
+    )
+    results["get_charger_data_tibber"] = await _measure(
+        lambda: _all("_get_charger_data_tibber"), args.repeat
+    )
+    results["get_offline_evs_data_tibber"] = await _measure(
+        lambda: _all("_get_offline_evs_data_tibber"), args.repeat
+    )
+
+    for coordinator, _data in zip(coordinators, data, strict=True):
+        coordinator.async_set_updated_data(_data)
+    hours = [
+        dt_util.parse_datetime(entry["time"])
+        for home in account.homes.values()
+        for entry in home.price_entries
+    ]
+
+    async def _get_price_at():
+        for _ in range(100):
+            for coordinator in coordinators:
+                for hour in hours:
+                    coordinator.get_price_at(hour)
+
+    results["get_price_at_x100"] = await _measure(_get_price_at, args.repeat)
+
+    entities = []
+    for coordinator in coordinators:
+        # pylint: disable-next=protected-access
+        home_sensors = sensor._home_sensors(  # noqa: SLF001
+            coordinator, {"password": "secret"}
+        )
+        entities.extend(home_sensors)
+        for entity_description in coordinator.chargers_entity_descriptions:
+            entities.append(sensor.TibberDataSensor(coordinator, entity_description))
+    for k, entity in enumerate(entities):
+        entity.hass = hass
+        entity.entity_id = f"sensor.tibber_data_bench_{k}"
+
+    async def _sensor_updates():
+        for entity in entities:
+            # pylint: disable-next=protected-access
+            entity._handle_coordinator_update()  # noqa: SLF001
+
+    results["sensor_updates"] = await _measure(_sensor_updates, args.repeat)
+    results["sensor_updates"]["entities"] = len(entities)
+
+    await hass.async_stop(force=True)
+    return results
+
+
+def compare(
+    results: dict, baseline: dict, tolerance: float, min_delta_ms: float
+) -> bool:
+    """Print the results next to the baseline and return False on regressions.
+
+    A case is slower only if it exceeds both the tolerance and min_delta_ms.
+    """
+    ok = True
+    for case, res in results.items():
+        base = baseline.get(case)
+        line = f"{case:30s} {res['time_ms']:10.3f} ms {res['peak_kb']:10.1f} kB"
+        if base is None:
+            print(line)
+            continue
+        time_ratio = res["time_ms"] / max(base["time_ms"], 1e-6)
+        peak_ratio = res["peak_kb"] / max(base["peak_kb"], 1e-6)
+        slower = (
+            time_ratio > tolerance and res["time_ms"] - base["time_ms"] > min_delta_ms
+        )
+        regression = slower or peak_ratio > tolerance
+        ok = ok and not regression
+        print(
+            f"{line}   x{time_ratio:5.2f} time  x{peak_ratio:5.2f} memory"
+            + ("  REGRESSION" if regression else "")
+        )
+    return ok
+
+
+def main():
+    """Run the benchmark suite."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--hours", type=int, default=9600)
+    parser.add_argument("--homes", type=int, default=1)
+    parser.add_argument("--chargers", type=int, default=2)
+    parser.add_argument("--evs", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--time-zone", default="Europe/Oslo")
+    parser.add_argument("--save", type=pathlib.Path, help="save results as baseline")
+    parser.add_argument("--compare", type=pathlib.Path, help="compare with baseline")
+    parser.add_argument("--tolerance", type=float, default=1.5)
+    parser.add_argument("--min-delta-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    params = {
+        "hours": args.hours,
+        "homes": args.homes,
+        "chargers": args.chargers,
+        "evs": args.evs,
+    }
+    results = asyncio.run(run_suite(args))
+
+    baseline = {}
+    if args.compare:
+        saved = json.loads(args.compare.read_text())
+        if saved["params"] != params:
+            print(f"Baseline was recorded with {saved['params']}, not {params}")
+        baseline = saved["results"]
+    ok = compare(results, baseline, args.tolerance, args.min_delta_ms)
+    if args.save:
+        args.save.write_text(
+            json.dumps({"params": params, "results": results}, indent=2) + "\n"
+        )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
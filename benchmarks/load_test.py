@@ -0,0 +1,143 @@
+"""Load test of the coordinators of many homes against the stand-in server.
+
+Starts the stand-in server on a local port, sets up a coordinator for each
+synthetic home through the real session, token manager and public API
+client, and reports the time of each round of updates and the requests seen
+by the server.
+
+    python benchmarks/load_test.py --homes 300 --chargers 2 --latency 0.05
+
+With --record the traffic is recorded, to be replayed by replay.py.
+"""
+import argparse
+import asyncio
+import datetime
+import logging
+import pathlib
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+import aiohttp  # noqa: E402
+import tibber  # noqa: E402
+from aiohttp import web  # noqa: E402
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.util import dt as dt_util  # noqa: E402
+from standin_server import (  # noqa: E402
+    PUBLIC_API_PATH,
+    add_arguments,
+    from_arguments,
+)
+from synthetic import FakeTibberHome  # noqa: E402
+
+from custom_components.tibber_data.backoff import (  # noqa: E402
+    PUBLIC_API,
+    CircuitBreakers,
+)
+from custom_components.tibber_data.const import DOMAIN  # noqa: E402
+from custom_components.tibber_data.data_coordinator import (  # noqa: E402
+    TibberDataCoordinator,
+)
+from custom_components.tibber_data.history_fetcher import (  # noqa: E402
+    HistoryFetcher,
+)
+from custom_components.tibber_data.tibber_api import (  # noqa: E402
+    RecordingPublicApi,
+    RecordingSession,
+    TibberPublicApi,
+    TrafficRecorder,
+    create_session,
+)
+from custom_components.tibber_data.token_manager import (  # noqa: E402
+    TibberTokenManager,
+)
+
+
+async def run(args):
+    """Run the load test."""
+    server = from_arguments(args)
+    runner = web.AppRunner(server.make_app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    hass = HomeAssistant(tempfile.mkdtemp())
+    hass.config.set_time_zone(args.time_zone)
+    session = create_session(args.connection_limit, base_url)
+    # pyTibber posts absolute urls, so it gets a session without base url
+    public_session = aiohttp.ClientSession()
+    controller = tibber.Tibber(
+        "standin", websession=public_session, user_agent="load-test"
+    )
+    api = TibberPublicApi(controller, f"{base_url}{PUBLIC_API_PATH}", "standin")
+    homes = [FakeTibberHome(home) for home in server.account.homes.values()]
+    recorder = None
+    if args.record:
+        recorder = TrafficRecorder(hass, str(args.record))
+        session = RecordingSession(session, recorder)
+        api = RecordingPublicApi(api, recorder)
+        for home in homes:
+            await home.update_price_info()
+            recorder.add_home(home)
+    breakers = CircuitBreakers()
+    hass.data[DOMAIN] = {
+        "coordinator": {},
+        "api": api,
+        "circuit_breakers": breakers,
+        "history_fetcher": HistoryFetcher(hass, api, breakers.get(PUBLIC_API)),
+        "update_semaphore": asyncio.Semaphore(args.max_concurrency),
+        "request_semaphore": asyncio.Semaphore(args.max_concurrency),
+    }
+    token_manager = TibberTokenManager(hass, session, "load@example.com", "secret")
+    coordinators = [
+        TibberDataCoordinator(hass, home, session, token_manager) for home in homes
+    ]
+
+    for round_k in range(args.rounds):
+        server.stats.clear()
+        start = time.perf_counter()
+        await asyncio.gather(*(c.async_refresh() for c in coordinators))
+        elapsed = time.perf_counter() - start
+        updated = sum(c.last_update_success and bool(c.data) for c in coordinators)
+        print(
+            f"round {round_k}: {elapsed:7.2f} s, {updated}/{len(coordinators)} homes"
+            f" updated, server {dict(server.stats)}"
+        )
+        due = dt_util.now() - datetime.timedelta(minutes=1)
+        for coordinator in coordinators:
+            # pylint: disable-next=protected-access
+            functions = coordinator._update_functions  # noqa: SLF001
+            for func in functions:
+                functions[func] = due
+
+    for coordinator in coordinators:
+        await coordinator.async_shutdown()
+    if recorder is not None:
+        await recorder.async_flush()
+    await hass.async_stop(force=True)
+    await session.close()
+    await public_session.close()
+    await runner.cleanup()
+
+
+def main():
+    """Run the load test."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--rounds", type=int, default=2)
+    parser.add_argument("--connection-limit", type=int, default=4)
+    parser.add_argument("--max-concurrency", type=int, default=4)
+    parser.add_argument("--time-zone", default="Europe/Oslo")
+    parser.add_argument("--record", type=pathlib.Path, help="record the traffic")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""Replay recorded Tibber API traffic through the coordinators, offline.
+
+Reads a file written with the record_traffic option, sets up a coordinator
+for each recorded home with the app API session and public API replaced by
+the recorded responses, and runs rounds of updates, reporting the time of
+each update function. Requests are matched on the query with the cursors
+and start times left out, and answered in the recorded order, repeating the
+last response once they run out. The clock is not replayed.
+
+    tibber_data:
+      record_traffic: tibber_data_traffic.jsonl.gz
+
+    python benchmarks/replay.py tibber_data_traffic.jsonl.gz --rounds 5
+    python benchmarks/replay.py tibber_data_traffic.jsonl.gz --profile replay.prof
+"""
+import argparse
+import asyncio
+import cProfile
+import datetime
+import gzip
+import json
+import logging
+import pathlib
+import sys
+import tempfile
+from collections import defaultdict
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+# pylint: disable=wrong-import-position
+from homeassistant.core import HomeAssistant  # noqa: E402
+from homeassistant.util import dt as dt_util  # noqa: E402
+
+from custom_components.tibber_data import history_fetcher  # noqa: E402
+from custom_components.tibber_data.backoff import (  # noqa: E402
+    PUBLIC_API,
+    CircuitBreakers,
+)
+from custom_components.tibber_data.const import DOMAIN  # noqa: E402
+from custom_components.tibber_data.data_coordinator import (  # noqa: E402
+    TibberDataCoordinator,
+)
+from custom_components.tibber_data.tibber_api import traffic_key  # noqa: E402
+from custom_components.tibber_data.token_manager import (  # noqa: E402
+    TibberTokenManager,
+)
+
+_NOT_RECORDED = {"errors": [{"message": "No recorded response"}]}
+
+
+class TrafficReplay:
+    """The recorded responses, by request."""
+
+    def __init__(self, path: pathlib.Path):
+        """Read the recorded traffic."""
+        self.homes: dict[str, dict] = {}
+        self.misses = 0
+        self._responses: dict[str, list] = defaultdict(list)
+        self._next: dict[str, int] = defaultdict(int)
+        with gzip.open(path, "rt", encoding="utf-8") as file:
+            for line in file:
+                record = json.loads(line)
+                if record["api"] == "home":
+                    self.homes[record["home"]["home_id"]] = record["home"]
+                elif record["api"] == "public":
+                    key = traffic_key("public", record["request"])
+                    self._responses[key].append(record["response"])
+                else:
+                    key = traffic_key(
+                        record["url"], (record["request"] or {}).get("query", "")
+                    )
+                    self._responses[key].append((record["status"], record["response"]))
+
+    def __len__(self) -> int:
+        """Return the number of recorded responses."""
+        return sum(len(responses) for responses in self._responses.values())
+
+    def next_response(self, key: str, default):
+        """Return the next recorded response of a request."""
+        if not (responses := self._responses.get(key)):
+            self.misses += 1
+            return default
+        k = self._next[key]
+        self._next[key] = k + 1
+        return responses[min(k, len(responses) - 1)]
+
+
+class _ReplayResponse:
+    def __init__(self, status: int, response):
+        self.status = status
+        self._response = response
+
+    async def read(self) -> bytes:
+        if isinstance(self._response, str):
+            return self._response.encode()
+        return json.dumps(self._response).encode()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+
+class ReplaySession:
+    """Stand-in for the app API session, answering from the recording."""
+
+    def __init__(self, replay: TrafficReplay):
+        """Initialize the session."""
+        self.replay = replay
+
+    def post(self, url: str, data: str = "", **_kwargs) -> _ReplayResponse:
+        """Answer a post to the app API."""
+        query = json.loads(data).get("query", "") if data else ""
+        status, response = self.replay.next_response(
+            traffic_key(url, query), (404, _NOT_RECORDED)
+        )
+        return _ReplayResponse(status, response)
+
+
+class ReplayPublicApi:
+    """Stand-in for the public API, answering from the recording."""
+
+    def __init__(self, replay: TrafficReplay):
+        """Initialize the API."""
+        self.replay = replay
+
+    async def execute(self, query: str) -> dict | None:
+        """Execute a GraphQL query and return the data."""
+        return self.replay.next_response(traffic_key("public", query), None)
+
+
+class ReplayTibberHome:
+    """Stand-in for pyTibber's TibberHome, with the recorded attributes."""
+
+    def __init__(self, home: dict):
+        """Initialize the home."""
+        for key, value in home.items():
+            setattr(self, key, value)
+        self.info = {"home_id": home["home_id"]}
+        self._timeout = 30
+
+    async def update_price_info(self):
+        """Keep the recorded prices."""
+
+
+async def run(args):
+    """Replay the traffic and print the time of each update function."""
+    replay = TrafficReplay(args.path)
+    print(f"{len(replay)} responses of {len(replay.homes)} homes in {args.path}")
+    hass = HomeAssistant(tempfile.mkdtemp())
+    hass.config.set_time_zone(args.time_zone)
+    history_fetcher.BATCH_DELAY = 0
+    api = ReplayPublicApi(replay)
+    breakers = CircuitBreakers()
+    hass.data[DOMAIN] = {
+        "coordinator": {},
+        "api": api,
+        "circuit_breakers": breakers,
+        "history_fetcher": history_fetcher.HistoryFetcher(
+            hass, api, breakers.get(PUBLIC_API)
+        ),
+    }
+    session = ReplaySession(replay)
+    token_manager = TibberTokenManager(hass, session, "replay", "replay")
+    coordinators = []
+    for home in replay.homes.values():
+        coordinator = TibberDataCoordinator(
+            hass, ReplayTibberHome(home), session, token_manager
+        )
+        hass.data[DOMAIN]["coordinator"][home["home_id"]] = coordinator
+        coordinators.append(coordinator)
+
+    profiler = cProfile.Profile() if args.profile else None
+    for round_k in range(args.rounds):
+        if profiler:
+            profiler.enable()
+        await asyncio.gather(*(c.async_refresh() for c in coordinators))
+        if profiler:
+            profiler.disable()
+        due = dt_util.now() - datetime.timedelta(minutes=1)
+        for coordinator in coordinators:
+            # pylint: disable-next=protected-access
+            functions = coordinator._update_functions  # noqa: SLF001
+            for func in functions:
+                functions[func] = due
+        print(f"round {round_k}: {replay.misses} requests not recorded")
+
+    for coordinator in coordinators:
+        print(coordinator.tibber_home.home_id)
+        for name, stats in coordinator.update_stats.functions.items():
+            print(
+                f"  {name:30s} {stats.calls:4d} calls {stats.errors:4d} errors"
+                f" {1000 * stats.total_time / stats.calls:10.3f} ms avg"
+                f" {1000 * stats.max_time:10.3f} ms max"
+            )
+        await coordinator.async_shutdown()
+    if profiler:
+        profiler.dump_stats(args.profile)
+        print(f"Profile written to {args.profile}")
+    await hass.async_stop(force=True)
+
+
+def main():
+    """Replay recorded traffic."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("path", type=pathlib.Path)
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--time-zone", default="Europe/Oslo")
+    parser.add_argument("--profile", type=pathlib.Path, help="write cProfile stats")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,200 @@
+"""Local stand-in for the Tibber login, app API and public GraphQL API.
+
+Serves a synthetic account on the endpoints used by this integration, with
+configurable latency, error rate, rate limit and token lifetime, so the
+coordinator can be load tested without network access. Point the
+integration at it with:
+
+    tibber_data:
+      app_url: http://127.0.0.1:8080
+      api_url: http://127.0.0.1:8080/v1-beta/gql
+
+    python benchmarks/standin_server.py --homes 200 --chargers 2 --latency 0.05
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import time
+from collections import Counter
+
+from aiohttp import web
+from synthetic import SyntheticTibber
+
+APP_API_PATH = "/v4/gql"
+LOGIN_PATH = "/v1/login.credentials"
+PUBLIC_API_PATH = "/v1-beta/gql"
+
+
+def _b64(data: dict) -> str:
+    return base64.urlsafe_b64encode(json.dumps(data).encode()).decode().rstrip("=")
+
+
+class StandInTibber:
+    """The stand-in server of a synthetic account."""
+
+    def __init__(
+        self,
+        account: SyntheticTibber,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        rate_limit: float = 0.0,
+        token_ttl: float = 3600,
+        seed: int = 1,
+    ):
+        """Initialize the server.
+
+        rate_limit is the number of requests per second allowed per client,
+        where 0 disables the limit.
+        """
+        self.account = account
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.token_ttl = token_ttl
+        self.stats: Counter = Counter()
+        self._rnd = random.Random(seed)
+        self._tokens: dict[str, float] = {}
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def make_app(self) -> web.Application:
+        """Return the aiohttp application."""
+        app = web.Application()
+        app.router.add_post(LOGIN_PATH, self._login)
+        app.router.add_post(APP_API_PATH, self._app_api)
+        app.router.add_post(PUBLIC_API_PATH, self._public_api)
+        return app
+
+    async def _prepare(self, client: str) -> web.Response | None:
+        """Delay the request and return an error response, if any."""
+        self.stats["requests"] += 1
+        if self.latency or self.jitter:
+            await asyncio.sleep(self.latency + self._rnd.uniform(0, self.jitter))
+        if self.rate_limit and not self._take_token(client):
+            self.stats["rate_limited"] += 1
+            return web.json_response(
+                {"errors": [{"message": "Too many requests"}]},
+                status=429,
+                headers={"Retry-After": "1"},
+            )
+        if self._rnd.random() < self.error_rate:
+            self.stats["errors"] += 1
+            return web.json_response(
+                {"errors": [{"message": "Internal server error"}]}, status=502
+            )
+        return None
+
+    def _take_token(self, client: str) -> bool:
+        """Take a request from the token bucket of a client."""
+        now = time.monotonic()
+        tokens, last = self._buckets.get(client, (self.rate_limit, now))
+        tokens = min(self.rate_limit, tokens + (now - last) * self.rate_limit)
+        if tokens < 1:
+            self._buckets[client] = (tokens, now)
+            return False
+        self._buckets[client] = (tokens - 1, now)
+        return True
+
+    def _issue_token(self) -> str:
+        """Return a new JWT shaped token."""
+        expires = time.time() + self.token_ttl
+        token = ".".join(
+            (
+                _b64({"alg": "none"}),
+                _b64({"exp": int(expires), "n": self.stats["logins"]}),
+                "standin",
+            )
+        )
+        self._tokens[token] = expires
+        return token
+
+    def _is_valid(self, token: str | None) -> bool:
+        return token is not None and self._tokens.get(token, 0) > time.time()
+
+    @staticmethod
+    def _unauthenticated() -> web.Response:
+        return web.json_response(
+            {
+                "errors": [
+                    {
+                        "message": "Unauthenticated",
+                        "extensions": {"code": "UNAUTHENTICATED"},
+                    }
+                ]
+            }
+        )
+
+    async def _login(self, request: web.Request) -> web.Response:
+        if error := await self._prepare(request.remote or ""):
+            return error
+        credentials = json.loads(await request.text())
+        if not credentials.get("email") or not credentials.get("password"):
+            return web.json_response({"message": "Wrong credentials"}, status=401)
+        self.stats["logins"] += 1
+        return web.json_response({"token": self._issue_token()})
+
+    async def _app_api(self, request: web.Request) -> web.Response:
+        token = request.cookies.get("token")
+        if error := await self._prepare(token or request.remote or ""):
+            return error
+        if not self._is_valid(token):
+            self.stats["unauthenticated"] += 1
+            return self._unauthenticated()
+        query = json.loads(await request.text())["query"]
+        return web.json_response(self.account.resolve_app(query))
+
+    async def _public_api(self, request: web.Request) -> web.Response:
+        authorization = request.headers.get("Authorization", "")
+        if error := await self._prepare(authorization or request.remote or ""):
+            return error
+        if not authorization.startswith("Bearer "):
+            self.stats["unauthenticated"] += 1
+            return self._unauthenticated()
+        if request.content_type == "application/json":
+            query = (await request.json())["query"]
+        else:
+            query = (await request.post())["query"]
+        return web.json_response({"data": self.account.resolve_history(query)})
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    """Add the options of the synthetic account and the server."""
+    parser.add_argument("--hours", type=int, default=744)
+    parser.add_argument("--homes", type=int, default=10)
+    parser.add_argument("--chargers", type=int, default=2)
+    parser.add_argument("--evs", type=int, default=1)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="seconds")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="per second")
+    parser.add_argument("--token-ttl", type=float, default=3600, help="seconds")
+
+
+def from_arguments(args) -> StandInTibber:
+    """Create the server from the parsed options."""
+    account = SyntheticTibber(args.hours, args.homes, args.chargers, args.evs)
+    return StandInTibber(
+        account,
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        rate_limit=args.rate_limit,
+        token_ttl=args.token_ttl,
+    )
+
+
+def main():
+    """Run the stand-in server."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args()
+    web.run_app(from_arguments(args).make_app(), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,312 @@
+"""Synthetic Tibber accounts for offline benchmarks.
+
+SyntheticTibber generates the hourly consumption, production, prices,
+chargers and offline evs of a number of homes, and answers the GraphQL
+queries of the integration with payloads in the shape of the Tibber APIs.
+FakeController, FakeSession and FakeTibberHome plug it into the coordinator
+in place of pyTibber and the app API.
+"""
+import base64
+import datetime
+import json
+import random
+import re
+
+from homeassistant.util import dt as dt_util
+
+_HOME = re.compile(r'(?:(\w+): )?home\(id: "([^"]+)"\)')
+_HISTORY = re.compile(
+    r"(consumption|production)\(resolution: HOURLY, "
+    r'(?:first: (\d+), after: ?"([^"]*)"|last: (\d+), before: ?"[^"]*")'
+)
+_CHARGER = re.compile(r'(?:(\w+): )?evCharger\( ?id: "([^"]+)"')
+_UPDATE_VEHICLE = re.compile(
+    r'updateVehicle\( id: "([^"]+)" settings: \[\{ key: "batteryLevel", value: "([^"]+)"'
+)
+_CHARGER_CONSUMPTION = re.compile(r'(?:(\w+): )?evChargerConsumption\( ?id: "([^"]+)"')
+
+
+def _encode_cursor(timestamp: datetime.datetime) -> str:
+    return base64.b64encode(timestamp.isoformat().encode("ascii")).decode()
+
+
+def _decode_cursor(cursor: str) -> datetime.datetime:
+    return dt_util.parse_datetime(base64.b64decode(cursor).decode("ascii"))
+
+
+class SyntheticHome:
+    """The generated data of one home."""
+
+    def __init__(
+        self,
+        home_id: str,
+        hours: int,
+        n_chargers: int,
+        now: datetime.datetime,
+        rnd: random.Random,
+    ):
+        """Generate the data of the home."""
+        self.home_id = home_id
+        end = dt_util.as_utc(now).replace(minute=0, second=0, microsecond=0)
+        self.starts = [
+            dt_util.as_local(end - datetime.timedelta(hours=k))
+            for k in range(hours, 0, -1)
+        ]
+        self.consumption = []
+        self.production = []
+        for start in self.starts:
+            base = 0.4 + 1.2 * (start.hour in (7, 8, 17, 18, 19, 20))
+            cons = round(base + rnd.uniform(0, 2.5), 3)
+            price = round(rnd.uniform(0.3, 3.5), 4)
+            self.consumption.append(
+                {
+                    "from": start.isoformat(),
+                    "to": (start + datetime.timedelta(hours=1)).isoformat(),
+                    "consumption": cons,
+                    "cost": round(cons * price, 4),
+                    "unitPrice": price,
+                    "unitPriceVAT": round(price / 5, 4),
+                }
+            )
+            profit = round(rnd.uniform(0, 1.5), 4) if 9 <= start.hour <= 17 else 0
+            self.production.append({"from": start.isoformat(), "profit": profit})
+
+        today = dt_util.start_of_local_day(now)
+        self.price_entries = []
+        for k in range(48):
+            start = dt_util.as_local(
+                dt_util.as_utc(today) + datetime.timedelta(hours=k)
+            )
+            self.price_entries.append(
+                {
+                    "time": start.isoformat(),
+                    "total": round(rnd.uniform(0.3, 3.5), 4),
+                    "gridPrice": round(rnd.uniform(0.2, 0.6), 4),
+                }
+            )
+        self.price_total = {
+            entry["time"]: entry["total"] for entry in self.price_entries
+        }
+
+        self.chargers = [f"{home_id}-charger-{k}" for k in range(n_chargers)]
+        month_start = dt_util.start_of_local_day(now).replace(day=1)
+        self.charger_consumption = [
+            {
+                "from": (month_start + datetime.timedelta(days=day)).isoformat(),
+                "consumption": round(rnd.uniform(0, 30), 3),
+                "energyCost": round(rnd.uniform(0, 60), 3),
+            }
+            for day in range(now.day)
+        ]
+
+    def history_page(self, kind: str, first, after, last) -> dict:
+        """Return a page of the consumption or production connection."""
+        nodes = self.consumption if kind == "consumption" else self.production
+        if last is not None:
+            return {"nodes": nodes[-int(last) :]}
+        after_ts = _decode_cursor(after)
+        k = next(
+            (k for k, start in enumerate(self.starts) if start > after_ts),
+            len(nodes),
+        )
+        page = nodes[k : k + int(first)]
+        return {
+            "pageInfo": {
+                "endCursor": (
+                    _encode_cursor(dt_util.parse_datetime(page[-1]["from"]))
+                    if page
+                    else None
+                ),
+                "hasNextPage": k + int(first) < len(nodes),
+            },
+            "nodes": page,
+        }
+
+    def charger_meta(self, charger_id: str) -> dict:
+        """Return the metadata of a charger."""
+        return {
+            "name": f"Charger {charger_id[-1]}",
+            "lastSeen": dt_util.now().isoformat(),
+            "settingsScreen": {
+                "settings": [
+                    {"key": "schedule.isEnabled", "value": "on"},
+                    {"key": "maxCircuitPower", "value": 32},
+                    {"key": "maxCurrentCharger", "value": 16},
+                    *(
+                        {"key": f"departureTimes.{day}", "value": "07:00"}
+                        for day in (
+                            "monday",
+                            "tuesday",
+                            "wednesday",
+                            "thursday",
+                            "friday",
+                            "saturday",
+                            "sunday",
+                        )
+                    ),
+                ]
+            },
+            "state": {
+                "cableIsLocked": True,
+                "isCharging": False,
+                "permanentCableLock": False,
+            },
+        }
+
+
+class SyntheticTibber:
+    """A synthetic Tibber account, answering the queries of the integration."""
+
+    def __init__(
+        self,
+        hours: int = 9600,
+        homes: int = 1,
+        chargers: int = 2,
+        evs: int = 1,
+        seed: int = 1,
+        now: datetime.datetime | None = None,
+    ):
+        """Generate the account."""
+        rnd = random.Random(seed)
+        now = now or dt_util.now()
+        self.homes = {
+            f"home-{k}": SyntheticHome(f"home-{k}", hours, chargers, now, rnd)
+            for k in range(homes)
+        }
+        self.evs = [
+            {
+                "title": f"Car {k}",
+                "id": f"ev-{k}",
+                "detailsScreen": {
+                    "settings": [
+                        {"key": "batteryLevel", "value": str(rnd.randint(10, 90))},
+                        {"key": "brandAndModel", "value": f"Brand Model {k}"},
+                    ]
+                },
+            }
+            for k in range(evs)
+        ]
+
+    def resolve_history(self, query: str) -> dict:
+        """Answer a query to the public API with the data of the viewer."""
+        viewer: dict = {}
+        for alias_match, history_match in zip(
+            _HOME.finditer(query), _HISTORY.finditer(query), strict=False
+        ):
+            alias, home_id = alias_match.groups()
+            kind, first, after, last = history_match.groups()
+            home = self.homes.get(home_id)
+            page = home.history_page(kind, first, after, last) if home else None
+            viewer[alias or "home"] = {kind: page}
+        return {"viewer": viewer}
+
+    def resolve_app(self, query: str) -> dict:
+        """Answer a query to the app API with the full response."""
+        if match := _UPDATE_VEHICLE.search(query):
+            device_id, soc = match.groups()
+            for vehicle in self.evs:
+                if vehicle["id"] == device_id:
+                    vehicle["detailsScreen"]["settings"][0]["value"] = soc
+            vehicles = [{"id": ev["id"], "title": ev["title"]} for ev in self.evs]
+            return {"data": {"me": {"updateVehicle": {"vehicles": vehicles}}}}
+        if "myVehicles" in query:
+            return {"data": {"me": {"myVehicles": {"vehicles": self.evs}}}}
+        if "homes" in query:
+            return {
+                "data": {
+                    "me": {
+                        "homes": [
+                            {
+                                "id": home.home_id,
+                                "address": {"addressText": home.home_id},
+                                "subscription": {
+                                    "priceRating": {
+                                        "hourly": {"entries": home.price_entries}
+                                    }
+                                },
+                            }
+                            for home in self.homes.values()
+                        ]
+                    }
+                }
+            }
+
+        home = self.homes[_HOME.search(query).group(2)]
+        res: dict = {}
+        if "bubbles" in query:
+            res["bubbles"] = [
+                {"type": "ev-charger", "id": charger} for charger in home.chargers
+            ] + [{"type": "heat-pump", "id": "hp"}]
+        for alias, charger_id in _CHARGER.findall(query):
+            res[alias or "evCharger"] = home.charger_meta(charger_id)
+        for alias, _ in _CHARGER_CONSUMPTION.findall(query):
+            res[alias or "evChargerConsumption"] = home.charger_consumption
+        return {"data": {"me": {"home": res}}}
+
+
+class FakeController:
+    """Stand-in for pyTibber's Tibber, answering from a synthetic account."""
+
+    def __init__(self, account: SyntheticTibber):
+        """Initialize the controller."""
+        self.account = account
+        self.queries = 0
+
+    async def execute(self, query: str) -> dict:
+        """Execute a GraphQL query."""
+        self.queries += 1
+        return self.account.resolve_history(query)
+
+
+class FakeTibberHome:
+    """Stand-in for pyTibber's TibberHome."""
+
+    def __init__(self, home: SyntheticHome):
+        """Initialize the home."""
+        self.home_id = home.home_id
+        self.name = home.home_id
+        self.address1 = home.home_id
+        self.country = "NO"
+        self.currency = "NOK"
+        self.price_unit = "NOK/kWh"
+        self.has_production = True
+        self.has_real_time_consumption = True
+        self.info = {"home_id": home.home_id}
+        self.price_total: dict[str, float] = {}
+        self._home = home
+        self._timeout = 30
+
+    async def update_price_info(self):
+        """Update the prices of today and tomorrow."""
+        self.price_total = self._home.price_total
+
+
+class _FakeResponse:
+    def __init__(self, payload: dict):
+        self.status = 200
+        self._payload = payload
+
+    async def read(self) -> bytes:
+        return json.dumps(self._payload).encode()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+
+class FakeSession:
+    """Stand-in for the aiohttp session of the app API."""
+
+    def __init__(self, account: SyntheticTibber):
+        """Initialize the session."""
+        self.account = account
+        self.requests = 0
+
+    def post(self, url: str, data: str = "", **_kwargs) -> _FakeResponse:
+        """Answer a post to the app API."""
+        self.requests += 1
+        if url.endswith("login.credentials"):
+            return _FakeResponse({"token": "synthetic-token"})
+        return _FakeResponse(self.account.resolve_app(json.loads(data)["query"]))
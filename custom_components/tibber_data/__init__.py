@@ -4,10 +4,34 @@ import logging
 from typing import cast
 
 import tibber
+from homeassistant.const import CONF_ACCESS_TOKEN, EVENT_HOMEASSISTANT_STOP
 from homeassistant.helpers import discovery
+from homeassistant.helpers.dispatcher import async_dispatcher_send
 
-from .const import DOMAIN, PLATFORMS
+from .backoff import PUBLIC_API, CircuitBreakers
+from .const import (
+    CONF_API_URL,
+    CONF_APP_URL,
+    CONF_CONNECTION_LIMIT,
+    CONF_MAX_CONCURRENCY,
+    CONF_RECORD_TRAFFIC,
+    DEFAULT_MAX_CONCURRENCY,
+    DOMAIN,
+    PLATFORMS,
+    SIGNAL_NEW_COORDINATOR,
+)
 from .data_coordinator import TibberDataCoordinator
+from .history_fetcher import HistoryFetcher
+from .tibber_api import (
+    DEFAULT_CONNECTION_LIMIT,
+    TIBBER_APP_URL,
+    RecordingPublicApi,
+    RecordingSession,
+    TibberPublicApi,
+    TrafficRecorder,
+    create_session,
+)
+from .token_manager import TibberTokenManager
 
 DEPENDENCIES = ["tibber"]
 
@@ -24,25 +48,65 @@ async def async_setup(hass, config):
         _LOGGER.error("Tibber integration not set up")
         return False
     hass.data[DOMAIN]["coordinator"] = {}
+
+    # Limits the update functions running at once across all homes, and the
+    # per charger requests running at once.
+    max_concurrency = config[DOMAIN].get(CONF_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY)
+    hass.data[DOMAIN]["update_semaphore"] = asyncio.Semaphore(max_concurrency)
+    hass.data[DOMAIN]["request_semaphore"] = asyncio.Semaphore(max_concurrency)
+
+    # The endpoints can be pointed at a local stand-in server for load tests
+    try:
+        session = create_session(
+            config[DOMAIN].get(CONF_CONNECTION_LIMIT, DEFAULT_CONNECTION_LIMIT),
+            config[DOMAIN].get(CONF_APP_URL, TIBBER_APP_URL),
+        )
+    except ValueError as err:
+        _LOGGER.error("Invalid %s: %s", CONF_APP_URL, err)
+        return False
+    api = _public_api(hass, tibber_data, config[DOMAIN].get(CONF_API_URL))
+
+    # The traffic can be recorded, to be replayed by benchmarks/replay.py
+    recorder = None
+    if record_path := config[DOMAIN].get(CONF_RECORD_TRAFFIC):
+        recorder = TrafficRecorder(hass, hass.config.path(record_path))
+        session = RecordingSession(session, recorder)
+        api = RecordingPublicApi(api, recorder)
+    hass.data[DOMAIN]["session"] = session
+    hass.data[DOMAIN]["api"] = api
+    # The failures of each endpoint are counted over all homes
+    breakers = hass.data[DOMAIN]["circuit_breakers"] = CircuitBreakers()
+    hass.data[DOMAIN]["history_fetcher"] = HistoryFetcher(
+        hass, api, breakers.get(PUBLIC_API)
+    )
+    hass.data[DOMAIN]["recorder"] = recorder
+
+    async def _async_close_session(_event):
+        await session.close()
+        if recorder is not None:
+            for coordinator in hass.data[DOMAIN]["coordinator"].values():
+                recorder.add_home(coordinator.tibber_home)
+            await recorder.async_flush()
+
+    hass.bus.async_listen_once(EVENT_HOMEASSISTANT_STOP, _async_close_session)
+
+    token_manager = None
+    if config[DOMAIN].get("password"):
+        token_manager = TibberTokenManager(
+            hass,
+            session,
+            config[DOMAIN].get("email"),
+            config[DOMAIN].get("password"),
+        )
+
+    # The homes are set up in the background, the platforms add the entities
+    # of each home when its coordinator is created.
     for home in tibber_data.get_homes(only_active=True):
         home = cast(tibber.TibberHome, home)
-        if not home.info:
-            for k in range(20):
-                try:
-                    await home.update_info()
-                except Exception:  # pylint: disable=broad-exception-caught
-                    _LOGGER.exception("Error")
-                    if k == 19:
-                        raise
-                    await asyncio.sleep(min(60, 2**k))
-                else:
-                    break
-
-        coordinator = TibberDataCoordinator(
-            hass, home, config[DOMAIN].get("email"), config[DOMAIN].get("password")
+        hass.async_create_background_task(
+            _async_setup_home(hass, home, session, token_manager),
+            name=f"tibber_data setup {home.home_id}",
         )
-        await coordinator.async_request_refresh()
-        hass.data[DOMAIN]["coordinator"][home.home_id] = coordinator
 
     for component in PLATFORMS:
         hass.async_create_task(
@@ -52,3 +116,35 @@ async def async_setup(hass, config):
         )
 
     return True
+
+
+def _public_api(hass, tibber_data: tibber.Tibber, api_url: str | None):
+    """Create the client of the public API, at another url if given."""
+    if api_url is None:
+        return TibberPublicApi(tibber_data)
+    # The queries to another url use the token of the Tibber integration
+    entry = hass.config_entries.async_entries("tibber")[0]
+    return TibberPublicApi(tibber_data, api_url, entry.data[CONF_ACCESS_TOKEN])
+
+
+async def _async_setup_home(hass, home: tibber.TibberHome, session, token_manager):
+    """Set up the coordinator of a home once the home info is available."""
+    if not home.info:
+        for k in range(20):
+            try:
+                await home.update_info()
+            except Exception:  # pylint: disable=broad-exception-caught
+                _LOGGER.exception("Error")
+                if k == 19:
+                    _LOGGER.error("Could not set up Tibber home %s", home.home_id)
+                    return
+                await asyncio.sleep(min(60, 2**k))
+            else:
+                break
+
+    if (recorder := hass.data[DOMAIN]["recorder"]) is not None:
+        recorder.add_home(home)
+    coordinator = TibberDataCoordinator(hass, home, session, token_manager)
+    hass.data[DOMAIN]["coordinator"][home.home_id] = coordinator
+    async_dispatcher_send(hass, SIGNAL_NEW_COORDINATOR, coordinator)
+    await coordinator.async_request_refresh()
@@ -0,0 +1,369 @@
+"""Single pass aggregation of the hourly Tibber consumption data."""
+import datetime
+from collections.abc import Iterable
+
+from homeassistant.util import dt as dt_util
+
+from .consumption_data import Consumption, ConsumptionNode
+
+HOURS_PER_YEAR = 365 * 24
+DAYS_PER_YEAR = 365.2425
+
+
+def epoch_hour(timestamp: datetime.datetime) -> int:
+    """Return the number of whole UTC hours since the epoch."""
+    return int(timestamp.timestamp()) // 3600
+
+
+def compare_shift_hours(years: int, same_weekday: bool = False) -> int:
+    """Return the shift in hours to the same period a number of years back."""
+    if same_weekday:
+        # Whole weeks, so a Monday is compared to a Monday
+        return round(DAYS_PER_YEAR * years / 7) * 7 * 24
+    return HOURS_PER_YEAR * years
+
+
+def calculate_subsidy(price):
+    """Calculate subsidy. Norway."""
+    vat_factor = 1.25
+    return max(0, 0.9 * (price - 0.73 * vat_factor))
+
+
+class ConsumptionAggregator:
+    """Derive all consumption statistics while walking the hourly nodes once."""
+
+    def __init__(self, now: datetime.datetime):
+        """Initialize the aggregator."""
+        self._now = now
+        self._today = now.date()
+        self._yesterday = self._today - datetime.timedelta(days=1)
+        self._tomorrow = self._today + datetime.timedelta(days=1)
+        self._prev_hour = (now - datetime.timedelta(hours=1)).replace(
+            minute=0, second=0, microsecond=0
+        )
+
+        self.month_consumption: set[Consumption] = set()
+        self.consumption_yesterday_available = False
+        self.consumption_prev_hour_available = False
+        self.prices_tomorrow_available = False
+
+        self._total_price = 0
+        self._n_price = 0
+        self._total_cost = 0
+        self._total_cons = 0
+        self._total_cost_day_subsidy = 0
+        self._total_cost_month_subsidy = 0
+        self._yearly_cost = 0
+        self._yearly_cons = 0
+        self._month_cons = 0
+        self._month_hours: list[int] = []
+        self._hourly_cons: dict[int, float] = {}
+        self._hourly_cost: dict[int, float] = {}
+        self._first_hour: int | None = None
+
+    def _is_current_month(self, date: datetime.datetime) -> bool:
+        return date.month == self._now.month and date.year == self._now.year
+
+    def add_node(self, node: ConsumptionNode) -> Consumption:
+        """Parse a consumption node from the Tibber API and add it."""
+        cons = Consumption(
+            dt_util.parse_datetime(node.start),
+            node.consumption,
+            node.unit_price,
+            node.cost,
+        )
+        self.add(cons)
+        return cons
+
+    def add(self, cons: Consumption):
+        """Add one hour of consumption data."""
+        date = cons.timestamp
+        hour = epoch_hour(date)
+        if self._first_hour is None or hour < self._first_hour:
+            self._first_hour = hour
+        if cons.cons is not None:
+            self._hourly_cons[hour] = cons.cons
+
+        if date.year != self._now.year:
+            return
+        if cons.cons is not None:
+            self._yearly_cons += cons.cons
+        if cons.cost is not None:
+            self._yearly_cost += cons.cost
+            self._hourly_cost[hour] = cons.cost
+
+        if date.month != self._now.month:
+            return
+        self.month_consumption.add(cons)
+        if cons.cons is None:
+            return
+
+        if date.date() == self._yesterday:
+            self.consumption_yesterday_available = True
+        if date == self._prev_hour:
+            self.consumption_prev_hour_available = True
+        self._month_cons += cons.cons
+        self._month_hours.append(hour)
+
+        if cons.cost is None:
+            return
+        self._total_price += cons.price if cons.price else 0
+        self._n_price += 1 if cons.price else 0
+        self._total_cost += cons.cost
+        self._total_cons += cons.cons
+        cost_subsidy = cons.cost - calculate_subsidy(cons.price or 0) * cons.cons
+        self._total_cost_month_subsidy += cost_subsidy
+        if cons.day == self._today:
+            self._total_cost_day_subsidy += cost_subsidy
+
+    @property
+    def first_hour(self) -> int | None:
+        """Return the UTC hour of the oldest hour added."""
+        return self._first_hour
+
+    def hourly_series(self) -> tuple[dict[int, float], dict[int, float]]:
+        """Return the consumption of all hours and the cost of this year's hours."""
+        return self._hourly_cons, self._hourly_cost
+
+    def add_price(self, date: datetime.datetime, price: float):
+        """Add the price of an hour without consumption data."""
+        if date.date() == self._tomorrow:
+            self.prices_tomorrow_available = True
+        if not self._is_current_month(date):
+            return
+        self.month_consumption.add(Consumption(date, None, price, None))
+
+    def compare_consumption(
+        self, years: int = 1, same_weekday: bool = False
+    ) -> float | None:
+        """Return the consumption in the same hours as this month, years back."""
+        shift = compare_shift_hours(years, same_weekday)
+        if not self._month_hours or self._first_hour is None:
+            return None
+        if self._month_hours[0] - shift < self._first_hour:
+            return None
+        return self._shifted_month_cons(shift)
+
+    def _shifted_month_cons(self, shift: int) -> float:
+        """Return the consumption in the hours of this month, shifted back."""
+        hourly_cons = self._hourly_cons
+        return sum(hourly_cons.get(hour - shift, 0) for hour in self._month_hours)
+
+    def _compare_stats(
+        self,
+        key: str,
+        prev_month_cons: float | None,
+        prev_label: str = "Month consumption last year",
+    ) -> dict:
+        """Return the stats of a comparison sensor."""
+        if prev_month_cons is None:
+            return {key: None, f"{key}_attrs": None}
+        return {
+            key: self._month_cons - prev_month_cons,
+            f"{key}_attrs": {
+                "Month consumption": self._month_cons,
+                prev_label: prev_month_cons,
+            },
+        }
+
+    def stats(self) -> dict:
+        """Return the aggregated statistics."""
+        res = {}
+        res["monthly_avg_price"] = (
+            self._total_price / self._n_price if self._n_price > 0 else None
+        )
+        res["customer_avg_price"] = (
+            self._total_cost / self._total_cons if self._total_cons > 0 else None
+        )
+        res["daily_cost_with_subsidy"] = self._total_cost_day_subsidy
+        res["monthly_cost_with_subsidy"] = self._total_cost_month_subsidy
+        res["yearly_cost"] = self._yearly_cost
+        res["yearly_cons"] = self._yearly_cons
+
+        prev_year_month_cons = self._shifted_month_cons(compare_shift_hours(1))
+        res["month_cons"] = self._month_cons
+        res["prev_year_month_cons"] = prev_year_month_cons
+        res.update(self._compare_stats("compare_cons", prev_year_month_cons))
+        res.update(
+            self._compare_stats(
+                "compare_cons_same_weekday",
+                self.compare_consumption(1, same_weekday=True),
+            )
+        )
+        res.update(
+            self._compare_stats(
+                "compare_cons_two_years",
+                self.compare_consumption(2),
+                "Month consumption two years ago",
+            )
+        )
+        return res
+
+
+def aggregate_consumption(
+    nodes: Iterable[ConsumptionNode],
+    prices: dict[str, float],
+    now: datetime.datetime,
+) -> ConsumptionAggregator:
+    """Aggregate consumption nodes and prices from the Tibber API."""
+    aggregator = ConsumptionAggregator(now)
+    for node in nodes:
+        aggregator.add_node(node)
+    for key, price in prices.items():
+        aggregator.add_price(dt_util.parse_datetime(key), price)
+    return aggregator
+
+
+class _MonthTotals:
+    """Running totals of the hours of one month."""
+
+    __slots__ = (
+        "cons",
+        "cost_subsidy",
+        "days",
+        "hours",
+        "n_price",
+        "total_cons",
+        "total_cost",
+        "total_price",
+    )
+
+    def __init__(self):
+        """Initialize the totals."""
+        self.hours: dict[int, Consumption] = {}
+        # Hours with consumption and cost with subsidy, by local day
+        self.days: dict[datetime.date, list] = {}
+        self.cons = 0.0
+        self.total_price = 0.0
+        self.n_price = 0
+        self.total_cost = 0.0
+        self.total_cons = 0.0
+        self.cost_subsidy = 0.0
+
+
+class RollingConsumptionAggregator(ConsumptionAggregator):
+    """Aggregator kept between updates and updated with the changed hours."""
+
+    def __init__(self, now: datetime.datetime):
+        """Initialize the aggregator for the year of now."""
+        super().__init__(now)
+        self._year = now.year
+        # Only the current and later months, past months are not shown again
+        self._months: dict[int, _MonthTotals] = {}
+        self._year_cons = 0.0
+        self._year_cost = 0.0
+        self._cons_index: dict[int, float] = {}
+        self._cost_index: dict[int, float] = {}
+        self._oldest_hour: int | None = None
+
+    def is_year_of(self, now: datetime.datetime) -> bool:
+        """Return True if the totals are for the year of now."""
+        return self._year == now.year
+
+    def seed(self, full: ConsumptionAggregator):
+        """Take the totals from a full aggregation of the history at now."""
+        self._cons_index, self._cost_index = full.hourly_series()
+        self._oldest_hour = full.first_hour
+        year_start = epoch_hour(
+            self._now.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
+        )
+        self._year_cons = sum(
+            cons for hour, cons in self._cons_index.items() if hour >= year_start
+        )
+        self._year_cost = sum(self._cost_index.values())
+        month = self._months[self._now.month] = _MonthTotals()
+        for cons in full.month_consumption:
+            month.hours[epoch_hour(cons.timestamp)] = cons
+            self._add_to_month(month, cons, 1)
+
+    def update(self, nodes: Iterable[ConsumptionNode]):
+        """Add new hours, or replace the totals of corrected ones."""
+        for node in nodes:
+            date = dt_util.parse_datetime(node.start)
+            hour = epoch_hour(date)
+            if self._oldest_hour is None or hour < self._oldest_hour:
+                self._oldest_hour = hour
+            old_cons = self._cons_index.get(hour)
+            if node.consumption is None:
+                self._cons_index.pop(hour, None)
+            else:
+                self._cons_index[hour] = node.consumption
+            if date.year != self._year:
+                continue
+            self._year_cons += (node.consumption or 0) - (old_cons or 0)
+            self._year_cost += (node.cost or 0) - self._cost_index.pop(hour, 0)
+            if node.cost is not None:
+                self._cost_index[hour] = node.cost
+            if date.month < self._now.month:
+                continue
+            month = self._months.get(date.month)
+            if month is None:
+                month = self._months[date.month] = _MonthTotals()
+            if (old := month.hours.get(hour)) is not None:
+                self._add_to_month(month, old, -1)
+            cons = Consumption(date, node.consumption, node.unit_price, node.cost)
+            month.hours[hour] = cons
+            self._add_to_month(month, cons, 1)
+
+    def drop_before(self, start: str | None):
+        """Forget the consumption of the hours before the oldest stored hour."""
+        if start is None:
+            return
+        oldest = epoch_hour(dt_util.parse_datetime(start))
+        if self._oldest_hour is not None and self._oldest_hour >= oldest:
+            return
+        self._oldest_hour = oldest
+        for hour in [hour for hour in self._cons_index if hour < oldest]:
+            del self._cons_index[hour]
+
+    @staticmethod
+    def _add_to_month(month: _MonthTotals, cons: Consumption, sign: int):
+        """Add an hour to the totals of its month, or remove it."""
+        if cons.cons is None:
+            return
+        month.cons += sign * cons.cons
+        day = month.days.get(cons.day)
+        if day is None:
+            day = month.days[cons.day] = [0, 0.0]
+        day[0] += sign
+        if cons.cost is None:
+            return
+        month.total_price += sign * (cons.price or 0)
+        month.n_price += sign * (1 if cons.price else 0)
+        month.total_cost += sign * cons.cost
+        month.total_cons += sign * cons.cons
+        cost_subsidy = cons.cost - calculate_subsidy(cons.price or 0) * cons.cons
+        month.cost_subsidy += sign * cost_subsidy
+        day[1] += sign * cost_subsidy
+
+    def set_now(self, now: datetime.datetime, prices: dict[str, float]):
+        """Derive the statistics of the day and month of now from the totals."""
+        # Resets the statistics of the previous call, not the totals
+        super().__init__(now)
+        for past in [past for past in self._months if past < now.month]:
+            del self._months[past]
+        self._hourly_cons = self._cons_index
+        self._first_hour = self._oldest_hour
+        self._yearly_cons = self._year_cons
+        self._yearly_cost = self._year_cost
+        if (month := self._months.get(now.month)) is not None:
+            self.month_consumption = set(month.hours.values())
+            self._month_hours = sorted(
+                hour for hour, cons in month.hours.items() if cons.cons is not None
+            )
+            self._month_cons = month.cons
+            self._total_price = month.total_price
+            self._n_price = month.n_price
+            self._total_cost = month.total_cost
+            self._total_cons = month.total_cons
+            self._total_cost_month_subsidy = month.cost_subsidy
+            if (today := month.days.get(self._today)) is not None:
+                self._total_cost_day_subsidy = today[1]
+            if (yesterday := month.days.get(self._yesterday)) is not None:
+                self.consumption_yesterday_available = yesterday[0] > 0
+            self.consumption_prev_hour_available = (
+                self._is_current_month(self._prev_hour)
+                and epoch_hour(self._prev_hour) in self._cons_index
+            )
+        for key, price in prices.items():
+            self.add_price(dt_util.parse_datetime(key), price)
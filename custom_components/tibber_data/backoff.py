@@ -0,0 +1,114 @@
+"""Backoff of failed updates and circuit breakers of the Tibber endpoints."""
+import datetime
+import logging
+from random import random
+
+BACKOFF_BASE = datetime.timedelta(minutes=2)
+BACKOFF_CAP = datetime.timedelta(hours=1)
+FAILURE_THRESHOLD = 5
+OPEN_TIME = datetime.timedelta(minutes=5)
+PROBE_TIMEOUT = datetime.timedelta(minutes=5)
+
+PUBLIC_API = "public_api"
+APP_API = "app_api"
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _ceiling(
+    base: datetime.timedelta, doublings: int, cap: datetime.timedelta
+) -> datetime.timedelta:
+    """Return base doubled a number of times, at most cap."""
+    return min(cap, base * 2 ** min(max(doublings, 0), 20))
+
+
+def full_jitter(failures: int) -> datetime.timedelta:
+    """Return a random delay before the retry after a number of failures."""
+    return _ceiling(BACKOFF_BASE, failures - 1, BACKOFF_CAP) * random()
+
+
+class CircuitBreaker:
+    """Consecutive failures of an endpoint, counted over all homes."""
+
+    def __init__(self, name: str):
+        """Initialize the breaker, closed."""
+        self.name = name
+        self.failures = 0
+        self.trips = 0
+        self.open_until: datetime.datetime | None = None
+        self._probe_until: datetime.datetime | None = None
+
+    @property
+    def is_open(self) -> bool:
+        """Return True if the calls are held back."""
+        return self.open_until is not None
+
+    def allow(self, now: datetime.datetime) -> bool:
+        """Return True if a call may be made."""
+        if self.open_until is None:
+            return True
+        if now < self.open_until:
+            return False
+        if self._probe_until is not None and now < self._probe_until:
+            return False
+        # Let a single probe through, or another one if it does not finish
+        self._probe_until = now + PROBE_TIMEOUT
+        return True
+
+    def retry_time(self, now: datetime.datetime) -> datetime.datetime:
+        """Return when a call held back should check the breaker again."""
+        return max(now, self.open_until or now) + full_jitter(1)
+
+    def record_success(self):
+        """Close the breaker after a successful call."""
+        if self.open_until is not None:
+            _LOGGER.info("Tibber %s requests work again", self.name)
+        self.failures = 0
+        self.trips = 0
+        self.open_until = None
+        self._probe_until = None
+
+    def record_failure(self, now: datetime.datetime):
+        """Count a failed call, and open the breaker if needed."""
+        self.failures += 1
+        if self.open_until is None:
+            if self.failures < FAILURE_THRESHOLD:
+                return
+        elif now < self.open_until:
+            # A call started before the breaker opened
+            return
+        self.trips += 1
+        self.open_until = now + _ceiling(OPEN_TIME, self.trips - 1, BACKOFF_CAP)
+        self._probe_until = None
+        _LOGGER.warning(
+            "Tibber %s requests failed %s times in a row, pausing them until %s",
+            self.name,
+            self.failures,
+            self.open_until,
+        )
+
+    def as_dict(self) -> dict:
+        """Return the state of the breaker."""
+        return {
+            "failures": self.failures,
+            "trips": self.trips,
+            "open_until": self.open_until.isoformat() if self.open_until else None,
+        }
+
+
+class CircuitBreakers:
+    """The circuit breakers of the endpoints, shared by all homes."""
+
+    def __init__(self):
+        """Initialize the breakers."""
+        self._breakers: dict[str, CircuitBreaker] = {}
+
+    def get(self, name: str) -> CircuitBreaker:
+        """Return the breaker of an endpoint."""
+        if (breaker := self._breakers.get(name)) is None:
+            breaker = self._breakers[name] = CircuitBreaker(name)
+        return breaker
+
+    def as_dict(self) -> dict:
+        """Return the state of all breakers."""
+        return {name: breaker.as_dict() for name, breaker in self._breakers.items()}
@@ -6,10 +6,12 @@ from homeassistant.components.binary_sensor import (
     BinarySensorEntityDescription,
 )
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 
-from .const import DOMAIN
+from .const import DOMAIN, SIGNAL_NEW_COORDINATOR
 from .data_coordinator import TibberDataCoordinator
+from .entity import WriteOnChangeMixin
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -18,33 +20,56 @@ async def async_setup_platform(hass: HomeAssistant, _, async_add_entities, confi
     """Set up the Tibber binary sensor."""
     if not config.get("password"):
         return
-    dev = []
-    for home in hass.data["tibber"].get_homes(only_active=True):
-        coordinator = hass.data[DOMAIN]["coordinator"][home.home_id]
-        for charger in coordinator.chargers:
-            dev.append(
-                TibberDataBinarySensor(
-                    coordinator,
-                    BinarySensorEntityDescription(
-                        key=f"charger_{charger}_sc_enabled",
-                        name=f"Smart charging enabled {coordinator.charger_name[charger]}",
-                    ),
+
+    @callback
+    def _async_add_coordinator(coordinator):
+        # The chargers are known after the first update
+        added_chargers = set()
+
+        @callback
+        def _async_add_chargers():
+            if coordinator.data is None:
+                return
+            dev = []
+            for charger in coordinator.chargers:
+                if (
+                    charger in added_chargers
+                    or charger not in coordinator.charger_name
+                    or f"charger_{charger}_is_charging" not in coordinator.data
+                ):
+                    continue
+                added_chargers.add(charger)
+                dev.append(
+                    TibberDataBinarySensor(
+                        coordinator,
+                        BinarySensorEntityDescription(
+                            key=f"charger_{charger}_sc_enabled",
+                            name=f"Smart charging enabled {coordinator.charger_name[charger]}",
+                        ),
+                    )
                 )
-            )
-            dev.append(
-                TibberDataBinarySensor(
-                    coordinator,
-                    BinarySensorEntityDescription(
-                        key=f"charger_{charger}_is_charging",
-                        name=f"Is charging {coordinator.charger_name[charger]}",
-                    ),
+                dev.append(
+                    TibberDataBinarySensor(
+                        coordinator,
+                        BinarySensorEntityDescription(
+                            key=f"charger_{charger}_is_charging",
+                            name=f"Is charging {coordinator.charger_name[charger]}",
+                        ),
+                    )
                 )
-            )
-        async_add_entities(dev)
+            if dev:
+                async_add_entities(dev)
+
+        _async_add_chargers()
+        coordinator.async_add_listener(_async_add_chargers)
+
+    for coordinator in hass.data[DOMAIN]["coordinator"].values():
+        _async_add_coordinator(coordinator)
+    async_dispatcher_connect(hass, SIGNAL_NEW_COORDINATOR, _async_add_coordinator)
 
 
 class TibberDataBinarySensor(
-    BinarySensorEntity, CoordinatorEntity[TibberDataCoordinator]
+    WriteOnChangeMixin, BinarySensorEntity, CoordinatorEntity[TibberDataCoordinator]
 ):
     """Representation of a Tibber binary sensor."""
 
@@ -60,8 +85,21 @@ class TibberDataBinarySensor(
             f"{self.entity_description.name} {self.coordinator.tibber_home.address1}"
         )
 
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return super().available and self.coordinator.data is not None
+
+    async def async_added_to_hass(self) -> None:
+        """When entity is added to hass."""
+        await super().async_added_to_hass()
+        if self.coordinator.data is not None:
+            self._handle_coordinator_update()
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
-        self._attr_is_on = self.coordinator.data.get(self.entity_description.key)
-        self.async_write_ha_state()
+        self._attr_is_on = (self.coordinator.data or {}).get(
+            self.entity_description.key
+        )
+        self.async_write_ha_state_if_changed(self._attr_is_on)
@@ -9,6 +9,18 @@ from homeassistant.const import Platform, UnitOfEnergy
 
 DOMAIN = "tibber_data"
 PLATFORMS = [Platform.SENSOR, Platform.BINARY_SENSOR]
+SIGNAL_NEW_COORDINATOR = f"{DOMAIN}_new_coordinator"
+
+CONF_API_URL = "api_url"
+CONF_APP_URL = "app_url"
+CONF_CONNECTION_LIMIT = "connection_limit"
+CONF_DIAGNOSTICS = "diagnostics"
+CONF_MAX_CONCURRENCY = "max_concurrency"
+CONF_RECORD_TRAFFIC = "record_traffic"
+DEFAULT_MAX_CONCURRENCY = 4
+
+# Upper limits of the capacity steps of the Norwegian grid tariff
+TARIFF_STEPS_KW = (2, 5, 10, 15, 20, 25, 50, 75, 100)
 
 SENSORS: tuple[SensorEntityDescription, ...] = (
     SensorEntityDescription(
@@ -64,6 +76,20 @@ SENSORS: tuple[SensorEntityDescription, ...] = (
         device_class=SensorDeviceClass.ENERGY,
         native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
     ),
+    SensorEntityDescription(
+        key="compare_cons_same_weekday",
+        name="Monthly consumption compared to last year same weekday",
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+    ),
+    SensorEntityDescription(
+        key="compare_cons_two_years",
+        name="Monthly consumption compared to two years ago",
+        state_class=SensorStateClass.MEASUREMENT,
+        device_class=SensorDeviceClass.ENERGY,
+        native_unit_of_measurement=UnitOfEnergy.KILO_WATT_HOUR,
+    ),
     SensorEntityDescription(
         key="monthly_cost_with_subsidy",
         name="Monthly cost with subsidy",
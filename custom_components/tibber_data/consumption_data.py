@@ -1,9 +1,35 @@
 """Consumption data for Tibber."""
+from typing import NamedTuple
+
 from homeassistant.util import dt as dt_util
 
 
+class ConsumptionNode(NamedTuple):
+    """One hour of consumption, as fetched from the Tibber API."""
+
+    start: str
+    consumption: float | None
+    cost: float | None
+    unit_price: float | None
+
+
+def parse_consumption_nodes(nodes: list[dict]) -> list[ConsumptionNode]:
+    """Keep only the fields in use from the consumption nodes of the API."""
+    return [
+        ConsumptionNode(
+            node["from"],
+            node.get("consumption"),
+            node.get("cost"),
+            node.get("unitPrice"),
+        )
+        for node in nodes
+    ]
+
+
 class Consumption:
-    """Consumption data."""
+    """Consumption data of one hour."""
+
+    __slots__ = ("cons", "cost", "day", "price", "timestamp")
 
     def __init__(self, timestamp, cons, price, cost):
         """Initialize the data."""
@@ -11,11 +37,7 @@ class Consumption:
         self.cons = cons
         self.price = price
         self.cost = cost
-
-    @property
-    def day(self):
-        """Return day."""
-        return dt_util.as_local(self.timestamp).date()
+        self.day = dt_util.as_local(timestamp).date()
 
     def __lt__(self, other):
         if self.cons is None and other.cons is None:
@@ -1,5 +1,6 @@
 """Data coordinator for Tibber."""
 import asyncio
+import contextlib
 import datetime
 import logging
 from random import randrange
@@ -12,125 +13,269 @@ from homeassistant.components.sensor import (
     SensorStateClass,
 )
 from homeassistant.const import PERCENTAGE, UnitOfElectricCurrent, UnitOfEnergy
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+from homeassistant.core import CALLBACK_TYPE, callback
+from homeassistant.helpers.event import async_track_time_change
+from homeassistant.helpers.update_coordinator import (
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
 from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN
+from .aggregation import (
+    RollingConsumptionAggregator,
+    aggregate_consumption,
+    calculate_subsidy,
+    epoch_hour,
+)
+from .backoff import APP_API, CircuitBreaker, CircuitBreakers, full_jitter
+from .const import DEFAULT_MAX_CONCURRENCY, DOMAIN
 from .consumption_data import Consumption
+from .history_store import ConsumptionHistoryStore
+from .instrumentation import UpdateStats
+from .peak_tracker import MonthPeakTracker
+from .price_views import (
+    EMPTY_PRICE_VIEW,
+    PriceView,
+    build_price_views,
+    parse_price_entries,
+)
 from .tibber_api import (
-    get_historic_data,
-    get_historic_production_data,
+    HISTORY_PAGE_SIZE,
+    TibberAuthError,
     get_tibber_chargers,
     get_tibber_chargers_data,
+    get_tibber_chargers_data_batch,
     get_tibber_data,
     get_tibber_offline_evs_data,
-    get_tibber_token,
 )
+from .token_manager import TibberTokenManager
 
 _LOGGER = logging.getLogger(__name__)
 
+MIN_UPDATE_INTERVAL = datetime.timedelta(seconds=5)
+
 
 class TibberDataCoordinator(DataUpdateCoordinator):
     """Handle Tibber data."""
 
-    def __init__(self, hass, tibber_home: tibber.TibberHome, email: str, password: str):
+    def __init__(
+        self,
+        hass,
+        tibber_home: tibber.TibberHome,
+        session: aiohttp.ClientSession,
+        token_manager: TibberTokenManager | None = None,
+    ):
         """Initialize the data handler."""
         super().__init__(
             hass,
             _LOGGER,
             name=f"Tibber Data {tibber_home.name}",
-            update_interval=datetime.timedelta(seconds=15),
+            update_interval=MIN_UPDATE_INTERVAL,
+            always_update=False,
         )
         self.tibber_home: tibber.TibberHome = tibber_home
         tibber_home._timeout = 30  # noqa: SLF001
-        self.email = email
-        self._password = password
-        self._token = None
+        self._token_manager = token_manager
         self._chargers: list[str] = []
         self._offline_evs: list[dict] = []
         self._month_consumption: set[Consumption] = set()
-
-        self._session = aiohttp.ClientSession()
+        self._price_index: dict[int, float | None] = {}
+        self._subsidy_index: dict[int, float] = {}
+        self._price_entries: list[tuple[datetime.datetime, dict]] = []
+        self._hourly_price_entries: list[dict] | None = None
+        self._aggregator: RollingConsumptionAggregator | None = None
+        self._aggregator_fingerprint: tuple | None = None
+        self._price_views: dict[str, PriceView] = {}
+        self._price_views_day: datetime.date | None = None
+        self._history = ConsumptionHistoryStore(hass, tibber_home.home_id)
+        self._peaks = MonthPeakTracker()
+        self._history_fetcher = hass.data[DOMAIN]["history_fetcher"]
+
+        self._session = session
+        self._update_semaphore = hass.data[DOMAIN].setdefault(
+            "update_semaphore", asyncio.Semaphore(DEFAULT_MAX_CONCURRENCY)
+        )
+        self._request_semaphore = hass.data[DOMAIN].setdefault(
+            "request_semaphore", asyncio.Semaphore(DEFAULT_MAX_CONCURRENCY)
+        )
+        # The endpoint failures of all homes are counted together
+        self._breakers: CircuitBreakers = hass.data[DOMAIN]["circuit_breakers"]
+        self._failures: dict = {}
         self.charger_name = {}
+        self.update_stats = UpdateStats()
 
         _next_update = dt_util.now() - datetime.timedelta(minutes=1)
         self._update_functions = {
             self._get_data: _next_update,
         }
-        if self._password:
+        if self._token_manager is not None:
             self._update_functions[self._get_data_tibber] = _next_update
             self._update_functions[self._get_charger_data_tibber] = _next_update
             self._update_functions[self._get_offline_evs_data_tibber] = _next_update
         if self.tibber_home.has_production:
             self._update_functions[self._get_production_data] = _next_update
 
+        self._unsub_hour_change: CALLBACK_TYPE | None = async_track_time_change(
+            hass, self._async_hour_changed, minute=0, second=0
+        )
+
+    async def async_shutdown(self) -> None:
+        """Cancel the hourly update of the listeners and any scheduled refresh."""
+        if self._unsub_hour_change is not None:
+            self._unsub_hour_change()
+            self._unsub_hour_change = None
+        await super().async_shutdown()
+
     def reset_updater(self):
         """Reset updater."""
         _next_update = dt_util.now() - datetime.timedelta(minutes=1)
         for key in self._update_functions:
             self._update_functions[key] = _next_update
+        self.hass.async_create_task(self.async_request_refresh())
+
+    @callback
+    def _async_hour_changed(self, _now):
+        """Let the sensors showing the current hour pick up the new hour."""
+        if self.data is not None:
+            self.async_update_listeners()
 
     def get_price_at(self, timestamp: datetime.datetime):
         """Get price at a specific time."""
-        timestamp = timestamp.replace(minute=0, second=0, microsecond=0)
-        for consumption in self._month_consumption:
-            if dt_util.as_local(consumption.timestamp) == dt_util.as_local(timestamp):
-                return consumption.price
-        return None
+        return self._price_index.get(epoch_hour(timestamp))
+
+    def get_price_view(self, key: str) -> PriceView:
+        """Get the precomputed view of the energy, grid or total price."""
+        today = dt_util.now().date()
+        if self._price_views_day != today:
+            self._price_views = build_price_views(self._price_entries, today)
+            self._price_views_day = today
+        return self._price_views.get(key, EMPTY_PRICE_VIEW)
+
+    def _update_price_index(self, month_consumption: set[Consumption]):
+        """Index the prices of the month by UTC hour."""
+        price_index = {
+            epoch_hour(cons.timestamp): cons.price for cons in month_consumption
+        }
+        if price_index == self._price_index:
+            return
+        self._price_index = price_index
+        self._subsidy_index = {
+            hour: calculate_subsidy(price)
+            for hour, price in price_index.items()
+            if price is not None
+        }
 
     async def _async_update_data(self):
         """Update data via API."""
         now = dt_util.now(dt_util.DEFAULT_TIME_ZONE)
 
-        async def _update(_data, _func):
-            try:
-                self._update_functions[_func] = await _func(_data, now)
-            except Exception:  # pylint: disable=broad-except
-                _LOGGER.exception("Error fetching Tibber data")
-                self._update_functions[_func] = now + datetime.timedelta(minutes=2)
-
-        data = {} if self.data is None else self.data
         tasks = []
         for func, next_update in self._update_functions.copy().items():
-            _LOGGER.info("Updating Tibber data %s %s", func, next_update)
             if now >= next_update:
-                tasks.append(_update(data, func))
-        await asyncio.gather(*tasks)
-        data["token"] = self._token
+                _LOGGER.debug("Updating Tibber data %s %s", func, next_update)
+                tasks.append(func)
+        if not tasks and self.data is not None:
+            self._schedule_next_update()
+            return self.data
+
+        # The listeners are only notified if the returned data differs from
+        # the previous data, so the update functions work on a copy.
+        data = {} if self.data is None else dict(self.data)
+        await asyncio.gather(
+            *(self._async_run_update(data, func, now) for func in tasks)
+        )
+        if self._token_manager is not None:
+            data["token"] = self._token_manager.token
         self.hass.data[DOMAIN][self.tibber_home.home_id] = data
+        self._schedule_next_update()
         return data
 
+    async def _async_run_update(self, data, func, now):
+        """Run an update function and schedule its next run."""
+        name = func.__name__.lstrip("_")
+        # The history functions wait for the shared batch of the history
+        # fetcher, so they must not block the updates of other homes. The
+        # fetcher counts the failures of the public API, once per request.
+        shared = func in (self._get_data, self._get_production_data)
+        if shared:
+            semaphore = contextlib.nullcontext()
+            breaker = self._history_fetcher.breaker
+        else:
+            semaphore = self._update_semaphore
+            breaker = self._breakers.get(APP_API)
+        scheduled = self._update_functions[func]
+        try:
+            async with semaphore:
+                if not breaker.allow(dt_util.now()):
+                    _LOGGER.debug("Holding back %s, Tibber is failing", name)
+                    self._update_functions[func] = breaker.retry_time(now)
+                    return
+                with self.update_stats.measure(name, dt_util.now() - scheduled):
+                    next_update = await func(data, now)
+        except TibberAuthError:
+            # The update function dropped the rejected token. A rejected
+            # token says nothing about the endpoint.
+            _LOGGER.warning("Tibber token rejected")
+        except UpdateFailed as err:
+            _LOGGER.debug("Error fetching Tibber data %s: %s", name, err)
+            if not shared:
+                breaker.record_failure(dt_util.now())
+        except Exception:  # pylint: disable=broad-except
+            if breaker.is_open:
+                _LOGGER.debug("Error fetching Tibber data %s", name, exc_info=True)
+            else:
+                _LOGGER.exception("Error fetching Tibber data %s", name)
+            if not shared:
+                breaker.record_failure(dt_util.now())
+        else:
+            if not shared:
+                breaker.record_success()
+            self._failures[func] = 0
+            self._update_functions[func] = next_update
+            return
+        self._update_functions[func] = self._retry_time(func, breaker, now)
+
+    def _retry_time(self, func, breaker: CircuitBreaker, now) -> datetime.datetime:
+        """Return when to retry a failed update function."""
+        self._failures[func] = failures = self._failures.get(func, 0) + 1
+        retry = now + full_jitter(failures)
+        if breaker.is_open:
+            retry = max(retry, breaker.retry_time(now))
+        return retry
+
+    def _schedule_next_update(self):
+        """Sleep until the first update function is due."""
+        next_update = min(self._update_functions.values())
+        self.update_interval = max(MIN_UPDATE_INTERVAL, next_update - dt_util.now())
+
     async def _get_data_tibber(self, data, now):
         """Update data via Tibber API."""
-        if self._token is None:
-            self._token = await get_tibber_token(
-                self._session, self.email, self._password
-            )
-            if self._token is None:
-                return now + datetime.timedelta(minutes=2)
+        if (token := await self._token_manager.async_get_token()) is None:
+            raise UpdateFailed("No Tibber token")
 
         try:
-            _data = await get_tibber_data(self._session, self._token)
-        except Exception:  # pylint: disable=broad-except
-            _LOGGER.exception("Error fetching Tibber data")
-            self._token = None
-            return now + datetime.timedelta(minutes=2)
-
+            _data = await get_tibber_data(self._session, token)
+        except TibberAuthError:
+            self._token_manager.invalidate(token)
+            raise
+        prices_tomorrow_available = False
         for home in _data["data"]["me"]["homes"]:
             if home["id"] != self.tibber_home.home_id:
                 continue
-            data["grid_price"] = {}
-            prices_tomorrow_available = False
-            for price_info in home["subscription"]["priceRating"]["hourly"]["entries"]:
-                dt_time = dt_util.parse_datetime(price_info["time"])
-                if dt_time.date() == now.date() + datetime.timedelta(days=1):
-                    prices_tomorrow_available = True
-                data["grid_price"][dt_time] = price_info["gridPrice"]
+            entries = home["subscription"]["priceRating"]["hourly"]["entries"]
+            # Retries mostly get the same prices, which need no parsing
+            if entries != self._hourly_price_entries:
+                self._hourly_price_entries = entries
+                self._price_entries = parse_price_entries(entries)
+                self._price_views = build_price_views(self._price_entries, now.date())
+                self._price_views_day = now.date()
+            tomorrow = now.date() + datetime.timedelta(days=1)
+            prices_tomorrow_available = any(
+                dt_time.date() == tomorrow for dt_time, _ in self._price_entries
+            )
 
             # Add all hourly entries to data
-            data["hourly_prices"] = home["subscription"]["priceRating"]["hourly"][
-                "entries"
-            ]
+            data["hourly_prices"] = entries
         if now.hour < 13:
             return now.replace(
                 hour=13, minute=0, second=0, microsecond=0
@@ -146,22 +291,14 @@ class TibberDataCoordinator(DataUpdateCoordinator):
 
     async def _get_offline_evs_data_tibber(self, data, now):
         """Update offline ev data via Tibber API."""
-        if self._token is None:
-            self._token = await get_tibber_token(
-                self._session, self.email, self._password
-            )
-            if self._token is None:
-                return now + datetime.timedelta(minutes=2)
+        if (token := await self._token_manager.async_get_token()) is None:
+            raise UpdateFailed("No Tibber token")
 
         try:
-            self._offline_evs = await get_tibber_offline_evs_data(
-                self._session, self._token
-            )
-        except Exception:  # pylint: disable=broad-except
-            _LOGGER.exception("Error fetching Tibber offline ev data")
-            self._token = None
-            return now + datetime.timedelta(minutes=2)
-
+            self._offline_evs = await get_tibber_offline_evs_data(self._session, token)
+        except TibberAuthError:
+            self._token_manager.invalidate(token)
+            raise
         if not self._offline_evs:
             return now + datetime.timedelta(hours=2)
 
@@ -172,111 +309,167 @@ class TibberDataCoordinator(DataUpdateCoordinator):
                 ]
         return now + datetime.timedelta(minutes=30)
 
-    async def _get_charger_data_tibber(self, data, now):
-        """Update charger data via Tibber API."""
-        # pylint: disable=too-many-locals, too-many-branches, too-many-statements
-        if self._token is None:
-            self._token = await get_tibber_token(
-                self._session, self.email, self._password
-            )
-            if self._token is None:
-                return now + datetime.timedelta(minutes=2)
-
+    async def _fetch_chargers_data(self, token: str) -> dict[str, dict]:
+        """Fetch the chargers of the home and their data in batched requests."""
+        home_id = self.tibber_home.home_id
         try:
-            self._chargers = await get_tibber_chargers(
-                self._session, self._token, self.tibber_home.home_id
+            res = await get_tibber_chargers_data_batch(
+                self._session, token, home_id, self._chargers, include_chargers=True
             )
+        except TibberAuthError:
+            raise
         except Exception:  # pylint: disable=broad-except
-            _LOGGER.exception("Error fetching Tibber charger data")
-            self._token = None
-            return now + datetime.timedelta(minutes=2)
+            _LOGGER.debug("Batched charger query failed", exc_info=True)
+            self._chargers = await get_tibber_chargers(self._session, token, home_id)
+            chargers_data = {}
+        else:
+            self._chargers = res["chargers"]
+            chargers_data = res["charger_data"]
+
+        # The caller fetches any chargers still missing one by one
+        if missing := [c for c in self._chargers if c not in chargers_data]:
+            try:
+                res = await get_tibber_chargers_data_batch(
+                    self._session, token, home_id, missing
+                )
+            except TibberAuthError:
+                raise
+            except Exception:  # pylint: disable=broad-except
+                _LOGGER.debug("Batched charger query failed", exc_info=True)
+            else:
+                chargers_data.update(res["charger_data"])
+        return chargers_data
+
+    async def _get_charger_data_tibber(self, data, now):
+        """Update charger data via Tibber API."""
+        if (token := await self._token_manager.async_get_token()) is None:
+            raise UpdateFailed("No Tibber token")
 
+        try:
+            chargers_data = await self._fetch_chargers_data(token)
+        except TibberAuthError:
+            self._token_manager.invalidate(token)
+            raise
         if not self._chargers:
             return now + datetime.timedelta(hours=2)
 
+        # Chargers that could not be fetched keep their previous values
+        missing = [c for c in self._chargers if c not in chargers_data]
+        results = await asyncio.gather(
+            *(self._fetch_charger_data(token, charger) for charger in missing),
+            return_exceptions=True,
+        )
+        auth_failed = False
+        for charger, res in zip(missing, results, strict=True):
+            if isinstance(res, TibberAuthError):
+                auth_failed = True
+            elif isinstance(res, Exception):
+                _LOGGER.warning("Error fetching data for charger %s: %s", charger, res)
+            else:
+                chargers_data[charger] = res
+
         for charger in self._chargers:
-            charger_data = await get_tibber_chargers_data(
+            if (charger_data := chargers_data.get(charger)) is None:
+                continue
+            try:
+                self._update_charger_data(data, now, charger, charger_data)
+            except (KeyError, TypeError, ValueError):
+                _LOGGER.exception("Unexpected data for charger %s", charger)
+
+        if auth_failed:
+            self._token_manager.invalidate(token)
+            raise TibberAuthError("Charger data request rejected")
+        return now + datetime.timedelta(minutes=15)
+
+    async def _fetch_charger_data(self, token: str, charger: str) -> dict:
+        """Fetch the data of one charger."""
+        async with self._request_semaphore:
+            return await get_tibber_chargers_data(
                 self._session,
-                self._token,
+                token,
                 self.tibber_home.home_id,
                 charger,
             )
-            charging_cost_day = 0
-            charging_consumption_day = 0
-            charging_cost_month = 0
-            charging_consumption_month = 0
-            for _hour in charger_data["charger_consumption"]:
-                _cost = _hour.get("energyCost")
-                _cons = _hour.get("consumption")
-                date = dt_util.parse_datetime(_hour.get("from"))
-                if not (date.month == now.month and date.year == now.year):
-                    continue
-                if _cost is not None:
-                    charging_cost_month += _cost
-                    if date.date() == now.date():
-                        charging_cost_day += _cost
-                if _cons is not None:
-                    charging_consumption_month += _cons
-                    if date.date() == now.date():
-                        charging_consumption_day += _cons
-            data[f"charger_{charger}_cost_day"] = charging_cost_day
-            data[f"charger_{charger}_cost_month"] = charging_cost_month
-            data[f"charger_{charger}_consumption_day"] = charging_consumption_day
-            data[f"charger_{charger}_consumption_month"] = charging_consumption_month
-            data[f"charger_{charger}_is_charging"] = charger_data["meta_data"]["state"][
-                "isCharging"
-            ]
-            for setting in charger_data["meta_data"]["settingsScreen"]["settings"]:
-                key = setting["key"]
-                val = setting["value"]
-                if key == "schedule.isEnabled":
-                    data[f"charger_{charger}_sc_enabled"] = val.lower() == "on"
-                elif key == "departureTimes.sunday":
-                    data[f"charger_{charger}_sunday_departure_time"] = val
-                elif key == "departureTimes.monday":
-                    data[f"charger_{charger}_monday_departure_time"] = val
-                elif key == "departureTimes.tuesday":
-                    data[f"charger_{charger}_tuesday_departure_time"] = val
-                elif key == "departureTimes.wednesday":
-                    data[f"charger_{charger}_wednesday_departure_time"] = val
-                elif key == "departureTimes.thursday":
-                    data[f"charger_{charger}_thursday_departure_time"] = val
-                elif key == "departureTimes.friday":
-                    data[f"charger_{charger}_friday_departure_time"] = val
-                elif key == "departureTimes.saturday":
-                    data[f"charger_{charger}_saturday_departure_time"] = val
-                elif key == "maxCircuitPower":
-                    data[f"charger_{charger}_max_circuit_power"] = val
-                elif key == "maxCurrentCharger":
-                    data[f"charger_{charger}_max_current_charger"] = val
-
-            self.charger_name[charger] = _name = charger_data["meta_data"]["name"]
-            data[f"charger_{charger}_consumption_month"] = charging_consumption_month
-            data[f"charger_{charger}_cost_day_name"] = f"{_name} cost day"
-            data[f"charger_{charger}_cost_month_name"] = f"{_name} cost month"
-            data[f"charger_{charger}_consumption_day_name"] = f"{_name} consumption day"
-            data[
-                f"charger_{charger}_consumption_month_name"
-            ] = f"{_name} consumption month"
-            data[
-                f"charger_{charger}_max_current_charger_name"
-            ] = f"{_name} max current charger"
-            data[
-                f"charger_{charger}_max_circuit_power_name"
-            ] = f"{_name} max circuit power"
-        return now + datetime.timedelta(minutes=15)
+
+    def _update_charger_data(self, data, now, charger: str, charger_data: dict):
+        """Update the data of one charger."""
+        # pylint: disable=too-many-locals, too-many-branches, too-many-statements
+        charging_cost_day = 0
+        charging_consumption_day = 0
+        charging_cost_month = 0
+        charging_consumption_month = 0
+        for _hour in charger_data["charger_consumption"]:
+            _cost = _hour.get("energyCost")
+            _cons = _hour.get("consumption")
+            date = dt_util.parse_datetime(_hour.get("from"))
+            if not (date.month == now.month and date.year == now.year):
+                continue
+            if _cost is not None:
+                charging_cost_month += _cost
+                if date.date() == now.date():
+                    charging_cost_day += _cost
+            if _cons is not None:
+                charging_consumption_month += _cons
+                if date.date() == now.date():
+                    charging_consumption_day += _cons
+        data[f"charger_{charger}_cost_day"] = charging_cost_day
+        data[f"charger_{charger}_cost_month"] = charging_cost_month
+        data[f"charger_{charger}_consumption_day"] = charging_consumption_day
+        data[f"charger_{charger}_consumption_month"] = charging_consumption_month
+        data[f"charger_{charger}_is_charging"] = charger_data["meta_data"]["state"][
+            "isCharging"
+        ]
+        for setting in charger_data["meta_data"]["settingsScreen"]["settings"]:
+            key = setting["key"]
+            val = setting["value"]
+            if key == "schedule.isEnabled":
+                data[f"charger_{charger}_sc_enabled"] = val.lower() == "on"
+            elif key == "departureTimes.sunday":
+                data[f"charger_{charger}_sunday_departure_time"] = val
+            elif key == "departureTimes.monday":
+                data[f"charger_{charger}_monday_departure_time"] = val
+            elif key == "departureTimes.tuesday":
+                data[f"charger_{charger}_tuesday_departure_time"] = val
+            elif key == "departureTimes.wednesday":
+                data[f"charger_{charger}_wednesday_departure_time"] = val
+            elif key == "departureTimes.thursday":
+                data[f"charger_{charger}_thursday_departure_time"] = val
+            elif key == "departureTimes.friday":
+                data[f"charger_{charger}_friday_departure_time"] = val
+            elif key == "departureTimes.saturday":
+                data[f"charger_{charger}_saturday_departure_time"] = val
+            elif key == "maxCircuitPower":
+                data[f"charger_{charger}_max_circuit_power"] = val
+            elif key == "maxCurrentCharger":
+                data[f"charger_{charger}_max_current_charger"] = val
+
+        self.charger_name[charger] = _name = charger_data["meta_data"]["name"]
+        data[f"charger_{charger}_consumption_month"] = charging_consumption_month
+        data[f"charger_{charger}_cost_day_name"] = f"{_name} cost day"
+        data[f"charger_{charger}_cost_month_name"] = f"{_name} cost month"
+        data[f"charger_{charger}_consumption_day_name"] = f"{_name} consumption day"
+        data[f"charger_{charger}_consumption_month_name"] = f"{_name} consumption month"
+        data[
+            f"charger_{charger}_max_current_charger_name"
+        ] = f"{_name} max current charger"
+        data[f"charger_{charger}_max_circuit_power_name"] = f"{_name} max circuit power"
 
     async def _get_production_data(self, data, now):
         """Get production data from Tibber."""
         # pylint: disable=too-many-locals, too-many-branches, too-many-statements
-        prod_data = await get_historic_production_data(
-            self.tibber_home, self.hass.data["tibber"]
+        prod_data = await self._history_fetcher.async_get_production(
+            self.tibber_home.home_id, 744
         )
+        if prod_data is None:
+            raise UpdateFailed("No production data")
 
         production_yesterday_available = False
         production_prev_hour_available = False
         production_profit_month = 0
         production_profit_day = 0
+        prev_hour = (now - datetime.timedelta(hours=1)).replace(
+            minute=0, second=0, microsecond=0
+        )
 
         for _hour in prod_data:
             _profit = _hour.get("profit")
@@ -287,7 +480,7 @@ class TibberDataCoordinator(DataUpdateCoordinator):
                 continue
             if date.date() == now.date() - datetime.timedelta(days=1):
                 production_yesterday_available = True
-            if date == now - datetime.timedelta(hours=1):
+            if date == prev_hour:
                 production_prev_hour_available = True
             production_profit_month += _profit
             if date.date() == now.date():
@@ -310,89 +503,92 @@ class TibberDataCoordinator(DataUpdateCoordinator):
         data["production_profit_day"] = production_profit_day
         return next_update
 
+    def _rolling_aggregator(self, now) -> RollingConsumptionAggregator:
+        """Return the rolling totals, seeded from the stored history in a new year."""
+        aggregator = self._aggregator
+        if aggregator is None or not aggregator.is_year_of(now):
+            aggregator = self._aggregator = RollingConsumptionAggregator(now)
+            aggregator.seed(aggregate_consumption(self._history.iter_nodes(), {}, now))
+            self._aggregator_fingerprint = None
+        return aggregator
+
+    def _merge_history(self, nodes):
+        """Store fetched nodes and pass the changed ones to the peaks and totals."""
+        new_nodes = self._history.merge(nodes)
+        self._peaks.add(new_nodes)
+        self._aggregator.update(new_nodes)
+        self._aggregator.drop_before(self._history.oldest_start())
+
     async def _get_data(self, data, now):
         """Get data from Tibber."""
         # pylint: disable=too-many-locals, too-many-branches, too-many-statements
-        cons_data = await get_historic_data(self.tibber_home, self.hass.data["tibber"])
-
-        consumption_yesterday_available = False
-        consumption_prev_hour_available = False
-        month_consumption = set()
-        max_month = []
+        await self._history.async_load()
+        # The peaks and totals are seeded from the stored history at start
+        # and at calendar boundaries, and then only get the changed hours.
+        if not self._peaks.is_month_of(now):
+            self._peaks.start_month(now, self._history.iter_nodes_newest_first())
+        aggregator = self._rolling_aggregator(now)
+
+        hours = self._history.hours_to_fetch(now)
+        if hours > HISTORY_PAGE_SIZE:
+            # Long histories are fetched page by page and stored as they come
+            async with self._update_semaphore:
+                async for page in self._history_fetcher.async_iter_pages(
+                    self.tibber_home, now - datetime.timedelta(hours=hours)
+                ):
+                    self._merge_history(page)
+        else:
+            cons_data = await self._history_fetcher.async_get_consumption(
+                self.tibber_home.home_id, hours
+            )
+            if cons_data is None:
+                raise UpdateFailed("No consumption data")
+            self._merge_history(cons_data)
+        data.update(self._peaks.stats())
 
-        for _hour in cons_data:
-            _cons = _hour.get("consumption")
-            date = dt_util.parse_datetime(_hour.get("from"))
-            if not (date.month == now.month and date.year == now.year):
-                continue
-            if _cons is not None:
-                if date.date() == now.date() - datetime.timedelta(days=1):
-                    consumption_yesterday_available = True
-                if date == now - datetime.timedelta(hours=1):
-                    consumption_prev_hour_available = True
-            cons = Consumption(date, _cons, _hour.get("unitPrice"), _hour.get("cost"))
-            month_consumption.add(cons)
-
-            if cons.cons is None:
-                continue
-            if len(max_month) < 3 or cons > max_month[-1]:
-                same_day = False
-                for k, _cons in enumerate(max_month):
-                    if cons.day == _cons.day:
-                        if cons > _cons:
-                            max_month[k] = cons
-                        same_day = True
-                        break
-                if not same_day:
-                    max_month.append(cons)
-                max_month.sort(reverse=True)
-                if len(max_month) > 3:
-                    del max_month[-1]
-
-        if max_month and sum(max_month) is not None:
-            data["peak_consumption"] = sum(max_month) / len(max_month)
-            data["peak_consumption_attrs"] = {
-                "peak_consumption_dates": [x.timestamp for x in max_month],
-                "peak_consumptions": [x.cons for x in max_month],
-            }
+        await self.tibber_home.update_price_info()
+        # The statistics only change with the stored hours, the prices and
+        # the current hour, so unchanged retries skip the aggregation.
+        fingerprint = (
+            self._history.revision,
+            tuple(self.tibber_home.price_total.items()),
+            now.replace(minute=0, second=0, microsecond=0),
+        )
+        changed = fingerprint != self._aggregator_fingerprint
+        if changed:
+            aggregator.set_now(now, self.tibber_home.price_total)
         else:
-            data["peak_consumption"] = None
-            data["peak_consumption_attrs"] = None
+            _LOGGER.debug("Unchanged consumption data for %s", self.tibber_home.name)
 
         if self.tibber_home.has_real_time_consumption:
-            if consumption_prev_hour_available:
+            if aggregator.consumption_prev_hour_available:
                 next_update = (now + datetime.timedelta(hours=1)).replace(
                     minute=2, second=0, microsecond=0
                 )
             else:
                 next_update = now + datetime.timedelta(minutes=2)
-        elif consumption_yesterday_available:
+        elif aggregator.consumption_yesterday_available:
             next_update = (now + datetime.timedelta(days=1)).replace(
                 hour=0, minute=0, second=0, microsecond=0
             )
         else:
             next_update = now + datetime.timedelta(minutes=15)
 
-        await self.tibber_home.update_price_info()
-        prices_tomorrow_available = False
-        for key, price in self.tibber_home.price_total.items():
-            date = dt_util.parse_datetime(key)
-            if date.date() == now.date() + datetime.timedelta(days=1):
-                prices_tomorrow_available = True
-            if not (date.month == now.month and date.year == now.year):
-                continue
-            month_consumption.add(Consumption(date, None, price, None))
-
-        cons_data_sorted = sorted(list(month_consumption), key=lambda x: x.timestamp)
-        for _cons in cons_data_sorted:
-            _LOGGER.debug("Cons: %s", _cons)
-
-        self.hass.data[DOMAIN][
-            f"month_consumption_{self.tibber_home.home_id}"
-        ] = month_consumption
-        self._month_consumption = month_consumption
-
-        if prices_tomorrow_available:
+        if changed:
+            month_consumption = aggregator.month_consumption
+            if _LOGGER.isEnabledFor(logging.DEBUG):
+                for _cons in sorted(month_consumption, key=lambda x: x.timestamp):
+                    _LOGGER.debug("Cons: %s", _cons)
+
+            self.hass.data[DOMAIN][
+                f"month_consumption_{self.tibber_home.home_id}"
+            ] = month_consumption
+            self._month_consumption = month_consumption
+            self._update_price_index(month_consumption)
+            data.update(aggregator.stats())
+            self._aggregator_fingerprint = fingerprint
+
+        if aggregator.prices_tomorrow_available:
             next_update = min(
                 next_update,
                 (now + datetime.timedelta(days=1)).replace(
@@ -406,76 +602,6 @@ class TibberDataCoordinator(DataUpdateCoordinator):
                 next_update,
                 now.replace(hour=13, minute=0, second=0, microsecond=0),
             )
-
-        _total_price = 0
-        _n_price = 0
-        total_price = 0
-        n_price = 0
-        total_cost = 0
-        total_cost_day = 0
-        total_cons = 0
-        total_cons_day = 0
-        total_cost_day_subsidy = 0
-        total_cost_month_subsidy = 0
-        for cons in month_consumption:
-            _total_price += cons.price if cons.price else 0
-            _n_price += 1 if cons.price else 0
-            if cons.cost is None or cons.cons is None:
-                continue
-            total_price += cons.price if cons.price else 0
-            n_price += 1 if cons.price else 0
-            total_cost += cons.cost
-            total_cons += cons.cons
-            total_cost_month_subsidy += (
-                cons.cost - calculate_subsidy(cons.price) * cons.cons
-            )
-            if cons.day == now.date():
-                total_cost_day += cons.cost
-                total_cons_day += cons.cons
-                total_cost_day_subsidy += (
-                    cons.cost - calculate_subsidy(cons.price) * cons.cons
-                )
-        data["monthly_avg_price"] = total_price / n_price if n_price > 0 else None
-        data["customer_avg_price"] = total_cost / total_cons if total_cons > 0 else None
-
-        data["daily_cost_with_subsidy"] = total_cost_day_subsidy
-        data["monthly_cost_with_subsidy"] = total_cost_month_subsidy
-
-        yearly_cost = 0
-        yearly_cons = 0
-        for _hour in cons_data:
-            date = dt_util.parse_datetime(_hour.get("from"))
-            if not date.year == now.year:
-                continue
-            if _hour.get("consumption") is not None:
-                yearly_cons += _hour["consumption"]
-            if _hour.get("cost") is not None:
-                yearly_cost += _hour["cost"]
-        data["yearly_cost"] = yearly_cost
-        data["yearly_cons"] = yearly_cons
-
-        month_cons = 0
-        month_cons_ts = []
-        for _hour in cons_data:
-            date = dt_util.parse_datetime(_hour.get("from"))
-            if not (date.year == now.year and date.month == now.month):
-                continue
-            if _hour.get("consumption") is not None:
-                month_cons += _hour["consumption"]
-                month_cons_ts.append(date)
-        data["month_cons"] = month_cons
-        prev_year_month_cons = 0
-        for _hour in cons_data:
-            if _hour.get("consumption") is None:
-                continue
-            date = dt_util.parse_datetime(_hour.get("from"))
-            _date = date + datetime.timedelta(days=365)
-            if _date in month_cons_ts:
-                prev_year_month_cons += _hour["consumption"]
-
-        data["prev_year_month_cons"] = prev_year_month_cons
-        data["compare_cons"] = month_cons - prev_year_month_cons
-
         return next_update
 
     @property
@@ -491,11 +617,21 @@ class TibberDataCoordinator(DataUpdateCoordinator):
             for ev_dev in self._offline_evs
         ]
 
+    @property
+    def diagnostics(self) -> dict:
+        """Return the timing and counters of the updates and API calls."""
+        return {
+            "functions": self.update_stats.as_dict(),
+            "history_fetcher": self._history_fetcher.stats.as_dict(),
+            "state_writes": self.update_stats.state_writes,
+            "skipped_state_writes": self.update_stats.skipped_state_writes,
+            "circuit_breakers": self._breakers.as_dict(),
+        }
+
     @property
     def subsidy(self):
         """Get subsidy."""
-        price = self.get_price_at(dt_util.now())
-        return calculate_subsidy(price)
+        return self._subsidy_index.get(epoch_hour(dt_util.now()))
 
     @property
     def chargers(self):
@@ -556,9 +692,3 @@ class TibberDataCoordinator(DataUpdateCoordinator):
                 )
             )
         return entity_descriptions
-
-
-def calculate_subsidy(price):
-    """Calculate subsidy. Norway."""
-    vat_factor = 1.25
-    return max(0, 0.9 * (price - 0.73 * vat_factor))
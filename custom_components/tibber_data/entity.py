@@ -0,0 +1,29 @@
+"""Shared behaviour of the Tibber data entities."""
+from homeassistant.core import callback
+
+
+class WriteOnChangeMixin:
+    """Write the state of a coordinator entity only when it has changed."""
+
+    _last_written: tuple | None = None
+
+    async def async_added_to_hass(self) -> None:
+        """Forget the state written before the entity was (re)added."""
+        self._last_written = None
+        await super().async_added_to_hass()
+
+    @callback
+    def async_write_ha_state_if_changed(self, value) -> None:
+        """Write the state, unless it is the one written last time."""
+        available = self.available
+        attributes = self.extra_state_attributes
+        stats = self.coordinator.update_stats
+        # New attribute objects are only created when their content changes
+        if (last := self._last_written) is not None and (
+            last[0] == available and last[1] == value and last[2] is attributes
+        ):
+            stats.skipped_state_writes += 1
+            return
+        self._last_written = (available, value, attributes)
+        stats.state_writes += 1
+        self.async_write_ha_state()
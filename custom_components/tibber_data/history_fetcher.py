@@ -0,0 +1,100 @@
+"""Shared fetcher of the historic data for all homes of an account."""
+import asyncio
+import logging
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from .backoff import CircuitBreaker
+from .instrumentation import UpdateStats
+from .tibber_api import TibberPublicApi, get_historic_data_batch, iter_historic_data
+
+BATCH_DELAY = 1.0
+MAX_BATCH_HOURS = 9600
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class HistoryFetcher:
+    """Collect the history requests of all homes into aliased queries."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        tibber_controller: TibberPublicApi,
+        breaker: CircuitBreaker,
+    ):
+        """Initialize the fetcher."""
+        self._hass = hass
+        self._tibber_controller = tibber_controller
+        # A failed batch counts once, however many homes it was sent for
+        self.breaker = breaker
+        self._pending: list[tuple[tuple[str, str, int], asyncio.Future]] = []
+        self._flush_task: asyncio.Task | None = None
+        self.stats = UpdateStats()
+
+    async def async_get_consumption(self, home_id: str, last: int):
+        """Get the hourly consumption nodes of a home."""
+        return await self._async_request(("consumption", home_id, last))
+
+    async def async_get_production(self, home_id: str, last: int):
+        """Get the hourly production nodes of a home."""
+        return await self._async_request(("production", home_id, last))
+
+    async def async_iter_pages(self, tibber_home, start):
+        """Yield the hourly consumption nodes of a home after start, page by page."""
+        try:
+            async for page in iter_historic_data(
+                tibber_home, self._tibber_controller, start
+            ):
+                yield page
+        except Exception:
+            self.breaker.record_failure(dt_util.now())
+            raise
+        self.breaker.record_success()
+
+    async def _async_request(self, request: tuple[str, str, int]):
+        """Queue a request and wait for the batch it is sent in."""
+        future = self._hass.loop.create_future()
+        self._pending.append((request, future))
+        if self._flush_task is None:
+            self._flush_task = self._hass.async_create_task(self._async_flush())
+        return await future
+
+    async def _async_flush(self):
+        """Send the queued requests."""
+        await asyncio.sleep(BATCH_DELAY)
+        pending, self._pending = self._pending, []
+        self._flush_task = None
+
+        batches = []
+        batch: list[tuple[tuple[str, str, int], asyncio.Future]] = []
+        batch_hours = 0
+        for request, future in pending:
+            if batch and batch_hours + request[2] > MAX_BATCH_HOURS:
+                batches.append(batch)
+                batch, batch_hours = [], 0
+            batch.append((request, future))
+            batch_hours += request[2]
+        if batch:
+            batches.append(batch)
+        await asyncio.gather(*(self._async_send(batch) for batch in batches))
+
+    async def _async_send(self, batch):
+        """Send one batch and hand the results to the waiting homes."""
+        _LOGGER.debug("Fetching history for %s requests", len(batch))
+        try:
+            with self.stats.measure("history_batch"):
+                results = await get_historic_data_batch(
+                    self._tibber_controller, [request for request, _ in batch]
+                )
+        except Exception as err:  # pylint: disable=broad-except
+            self.breaker.record_failure(dt_util.now())
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(err)
+            return
+        self.breaker.record_success()
+        for (_, future), result in zip(batch, results, strict=True):
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,149 @@
+"""Persistent store of the hourly consumption history fetched from Tibber."""
+import datetime
+import logging
+import math
+
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+
+from .const import DOMAIN
+from .consumption_data import ConsumptionNode, parse_consumption_nodes
+
+STORAGE_VERSION = 2
+SAVE_DELAY = 60
+
+# The API returns at most MAX_FETCH_HOURS, but the store keeps a little more
+# than two years, so the monthly consumption can be compared two years back.
+MAX_FETCH_HOURS = 9600
+MAX_HISTORY_HOURS = 2 * 366 * 24 + 31 * 24
+CORRECTION_WINDOW_HOURS = 48
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def _is_before(start: str, other: str) -> bool:
+    """Return True if an hour starts before another."""
+    # ISO times with the same UTC offset sort as strings
+    if start[-6:] == other[-6:]:
+        return start < other
+    return dt_util.parse_datetime(start) < dt_util.parse_datetime(other)
+
+
+class _HistoryStore(Store):
+    """Store of the consumption history."""
+
+    async def _async_migrate_func(self, old_major_version, old_minor_version, old_data):
+        """Migrate the stored nodes from dicts to lists."""
+        if old_major_version == 1:
+            old_data["nodes"] = [
+                list(node)
+                for node in parse_consumption_nodes(old_data.get("nodes", []))
+            ]
+        return old_data
+
+
+class ConsumptionHistoryStore:
+    """Hourly consumption nodes, kept in the Home Assistant .storage folder."""
+
+    def __init__(
+        self, hass: HomeAssistant, home_id: str, max_hours: int = MAX_HISTORY_HOURS
+    ):
+        """Initialize the store."""
+        self._store: Store = _HistoryStore(
+            hass, STORAGE_VERSION, f"{DOMAIN}.consumption_{home_id}"
+        )
+        self._max_hours = max_hours
+        self._nodes: dict[str, ConsumptionNode] = {}
+        self._loaded = False
+        # Changes whenever the nodes change, to detect unchanged fetches
+        self.revision = 0
+
+    async def async_load(self):
+        """Load the stored nodes from disk."""
+        if self._loaded:
+            return
+        self._loaded = True
+        if not (stored := await self._store.async_load()):
+            return
+        self._nodes = {
+            node[0]: ConsumptionNode(*node) for node in stored.get("nodes", [])
+        }
+        starts = list(self._nodes)
+        if any(map(_is_before, starts[1:], starts)):
+            self._sort()
+        self.revision += 1
+        _LOGGER.debug("Loaded %s stored consumption hours", len(self._nodes))
+
+    @property
+    def nodes(self) -> list[ConsumptionNode]:
+        """Return all stored nodes, oldest first."""
+        return list(self._nodes.values())
+
+    def last_complete_hour(self) -> datetime.datetime | None:
+        """Return the start of the newest hour with consumption data."""
+        for node in reversed(self._nodes.values()):
+            if node.consumption is not None:
+                return dt_util.parse_datetime(node.start)
+        return None
+
+    def hours_to_fetch(self, now: datetime.datetime) -> int:
+        """Return the number of hours that have to be fetched from the API."""
+        if (last_complete := self.last_complete_hour()) is None:
+            return MAX_FETCH_HOURS
+        missing = math.ceil((now - last_complete).total_seconds() / 3600)
+        return max(1, min(MAX_FETCH_HOURS, missing + CORRECTION_WINDOW_HOURS))
+
+    def iter_nodes(self):
+        """Iterate over the stored nodes, oldest first."""
+        return iter(self._nodes.values())
+
+    def oldest_start(self) -> str | None:
+        """Return the start of the oldest stored hour."""
+        return next(iter(self._nodes), None)
+
+    def iter_nodes_newest_first(self):
+        """Iterate over the stored nodes, newest first."""
+        return reversed(self._nodes.values())
+
+    def merge(self, nodes: list[ConsumptionNode]) -> list[ConsumptionNode]:
+        """Merge newly fetched nodes and return the added or changed ones."""
+        stored = self._nodes
+        newest = next(reversed(stored), None)
+        unsorted = False
+        changed = []
+        for node in nodes:
+            if (old := stored.get(node.start)) == node:
+                continue
+            if old is None:
+                if newest is not None and _is_before(node.start, newest):
+                    unsorted = True
+                else:
+                    newest = node.start
+            stored[node.start] = node
+            changed.append(node)
+        if not changed:
+            return changed
+        if unsorted:
+            # Backfilled hours are appended, so the order is restored
+            self._sort()
+            stored = self._nodes
+        if (n_drop := len(stored) - self._max_hours) > 0:
+            for key in list(stored)[:n_drop]:
+                del stored[key]
+        self.revision += 1
+        self._store.async_delay_save(self._data_to_save, SAVE_DELAY)
+        return changed
+
+    def _sort(self):
+        """Sort the nodes by start time."""
+        self._nodes = dict(
+            sorted(
+                self._nodes.items(),
+                key=lambda item: dt_util.parse_datetime(item[0]),
+            )
+        )
+
+    def _data_to_save(self) -> dict:
+        """Return data to store on disk."""
+        return {"nodes": [list(node) for node in self._nodes.values()]}
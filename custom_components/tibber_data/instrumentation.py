@@ -0,0 +1,141 @@
+"""Timing and counters of the update functions and the Tibber API calls."""
+import contextlib
+import datetime
+import time
+from contextvars import ContextVar
+
+_CURRENT: ContextVar["FunctionStats | None"] = ContextVar(
+    "tibber_data_function_stats", default=None
+)
+
+
+class CallStats:
+    """Counters of a series of timed calls."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.calls = 0
+        self.errors = 0
+        self.bytes = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time: float | None = None
+
+    def add(self, elapsed: float, failed: bool, n_bytes: int = 0):
+        """Add a call."""
+        self.calls += 1
+        self.errors += failed
+        self.bytes += n_bytes
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.last_time = elapsed
+
+    def as_dict(self) -> dict:
+        """Return the counters, with the times in milliseconds."""
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "bytes": self.bytes,
+            "avg_ms": round(1000 * self.total_time / self.calls, 1)
+            if self.calls
+            else None,
+            "max_ms": round(1000 * self.max_time, 1),
+            "last_ms": round(1000 * self.last_time, 1)
+            if self.last_time is not None
+            else None,
+        }
+
+
+class FunctionStats(CallStats):
+    """Counters of an update function and the API calls it makes."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        super().__init__()
+        self.api_calls: dict[str, CallStats] = {}
+        self.last_delay: float | None = None
+        self.max_delay = 0.0
+
+    def add_delay(self, delay: datetime.timedelta):
+        """Add how late the function started compared with its schedule."""
+        seconds = max(0.0, delay.total_seconds())
+        self.last_delay = seconds
+        self.max_delay = max(self.max_delay, seconds)
+
+    def add_api_call(self, name: str, elapsed: float, failed: bool, n_bytes: int):
+        """Add an API call made by the function."""
+        self.api_calls.setdefault(name, CallStats()).add(elapsed, failed, n_bytes)
+
+    def as_dict(self) -> dict:
+        """Return the counters of the function and its API calls."""
+        return {
+            **super().as_dict(),
+            "last_delay_s": round(self.last_delay, 1)
+            if self.last_delay is not None
+            else None,
+            "max_delay_s": round(self.max_delay, 1),
+            "api_calls": {
+                name: stats.as_dict() for name, stats in self.api_calls.items()
+            },
+        }
+
+
+class UpdateStats:
+    """Counters of the update functions of a home."""
+
+    def __init__(self):
+        """Initialize the counters."""
+        self.functions: dict[str, FunctionStats] = {}
+        self.state_writes = 0
+        self.skipped_state_writes = 0
+
+    @contextlib.contextmanager
+    def measure(self, name: str, delay: datetime.timedelta | None = None):
+        """Time an update function and count the API calls made within it."""
+        stats = self.functions.setdefault(name, FunctionStats())
+        if delay is not None:
+            stats.add_delay(delay)
+        token = _CURRENT.set(stats)
+        start = time.perf_counter()
+        failed = True
+        try:
+            yield stats
+            failed = False
+        finally:
+            stats.add(time.perf_counter() - start, failed)
+            _CURRENT.reset(token)
+
+    @property
+    def api_calls(self) -> int:
+        """Return the number of API calls made by all functions."""
+        return sum(
+            stats.calls
+            for function in self.functions.values()
+            for stats in function.api_calls.values()
+        )
+
+    def as_dict(self) -> dict:
+        """Return the counters of all functions."""
+        return {name: stats.as_dict() for name, stats in self.functions.items()}
+
+
+class ApiCall:
+    """An API call in progress."""
+
+    def __init__(self):
+        """Initialize the call."""
+        self.n_bytes = 0
+
+
+@contextlib.contextmanager
+def api_call(name: str):
+    """Time an API call and count it for the running update function."""
+    call = ApiCall()
+    start = time.perf_counter()
+    failed = True
+    try:
+        yield call
+        failed = False
+    finally:
+        if (stats := _CURRENT.get()) is not None:
+            stats.add_api_call(name, time.perf_counter() - start, failed, call.n_bytes)
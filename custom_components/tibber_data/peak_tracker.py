@@ -0,0 +1,128 @@
+"""Tracker of the three highest hours of the month, on distinct days."""
+import datetime
+import heapq
+from collections.abc import Iterable
+
+from homeassistant.util import dt as dt_util
+
+from .const import TARIFF_STEPS_KW
+from .consumption_data import ConsumptionNode
+
+# The average of the peaks sets the capacity step (kapasitetsledd) of the tariff
+N_PEAKS = 3
+
+
+def _month_key(now: datetime.datetime) -> str:
+    """Return the month as the prefix of the ISO start time of its hours."""
+    return f"{now.year:04d}-{now.month:02d}"
+
+
+def tariff_step(peak: float) -> tuple[str, float | None]:
+    """Return the label and the upper limit of the capacity step of a peak."""
+    lower = 0
+    for upper in TARIFF_STEPS_KW:
+        if peak < upper:
+            return f"{lower}-{upper} kW", upper
+        lower = upper
+    return f"{lower}+ kW", None
+
+
+class MonthPeakTracker:
+    """The highest hour of each day of the month."""
+
+    def __init__(self):
+        """Initialize the tracker."""
+        self.month: str | None = None
+        self._days: dict[datetime.date, dict[str, float]] = {}
+        self._day_max: dict[datetime.date, tuple[float, str]] = {}
+        self._stats: dict | None = None
+
+    def is_month_of(self, now: datetime.datetime) -> bool:
+        """Return True if the tracked month is the month of now."""
+        return self.month == _month_key(now)
+
+    def start_month(
+        self, now: datetime.datetime, nodes_newest_first: Iterable[ConsumptionNode]
+    ):
+        """Forget the previous month and add the stored hours of this month."""
+        self.month = _month_key(now)
+        self._days.clear()
+        self._day_max.clear()
+        self._stats = None
+        for node in nodes_newest_first:
+            if node.start < self.month:
+                break
+            if node.start.startswith(self.month) and node.consumption is not None:
+                self._add_hour(node.start, node.consumption)
+
+    def add(self, nodes: Iterable[ConsumptionNode]) -> bool:
+        """Add fetched hours and return True if any tracked hour changed."""
+        changed = False
+        for node in nodes:
+            if not node.start.startswith(self.month):
+                continue
+            changed |= self._add_hour(node.start, node.consumption)
+        return changed
+
+    def _add_hour(self, start: str, cons: float | None) -> bool:
+        """Add, replace or remove an hour and return True if it changed."""
+        day = dt_util.as_local(dt_util.parse_datetime(start)).date()
+        hours = self._days.get(day, {})
+        if (old := hours.get(start)) == cons:
+            return False
+        self._days[day] = hours
+        if cons is None:
+            del hours[start]
+        else:
+            hours[start] = cons
+        best = self._day_max.get(day)
+        if cons is not None and (best is None or cons > best[0]):
+            self._day_max[day] = (cons, start)
+        elif best is not None and best[1] == start and (cons is None or cons < old):
+            if hours:
+                self._day_max[day] = max((c, s) for s, c in hours.items())
+            else:
+                del self._day_max[day]
+                del self._days[day]
+        else:
+            # The highest hour of the day is unchanged, and so are the stats
+            return True
+        self._stats = None
+        return True
+
+    def peaks(self) -> list[tuple[float, str]]:
+        """Return the consumption and start of the highest hour of the top days."""
+        return heapq.nlargest(N_PEAKS, self._day_max.values())
+
+    def stats(self) -> dict:
+        """Return the peak consumption and the tariff step attributes."""
+        if self._stats is not None:
+            return self._stats
+        if not (peaks := self.peaks()):
+            self._stats = {"peak_consumption": None, "peak_consumption_attrs": None}
+            return self._stats
+
+        consumptions = [cons for cons, _ in peaks]
+        peak = sum(consumptions) / len(consumptions)
+        step, upper = tariff_step(peak)
+        # The highest consumption of the next top day that keeps the average
+        # within the current step.
+        n_kept = min(len(peaks), N_PEAKS - 1)
+        headroom = (
+            round((n_kept + 1) * upper - sum(consumptions[:n_kept]), 3)
+            if upper is not None
+            else None
+        )
+        self._stats = {
+            "peak_consumption": peak,
+            "peak_consumption_attrs": {
+                "peak_consumption_dates": [
+                    dt_util.parse_datetime(start) for _, start in peaks
+                ],
+                "peak_consumptions": consumptions,
+                "tariff_step": step,
+                "tariff_step_limit": upper,
+                "peak_headroom": headroom,
+            },
+        }
+        return self._stats
@@ -0,0 +1,91 @@
+"""Precomputed views of the hourly prices from the Tibber app API."""
+import datetime
+
+from homeassistant.util import dt as dt_util
+
+from .aggregation import epoch_hour
+
+
+class PriceView:
+    """Hourly prices of one kind, with the today and tomorrow attributes."""
+
+    def __init__(self, prices: dict[int, float | None], attrs: dict):
+        """Initialize the view."""
+        self.prices = prices
+        self.attrs = attrs
+
+    def price_at(self, timestamp: datetime.datetime) -> float | None:
+        """Return the price of the hour containing timestamp."""
+        return self.prices.get(epoch_hour(timestamp))
+
+
+EMPTY_PRICE_VIEW = PriceView({}, {})
+
+
+def parse_price_entries(entries: list[dict]) -> list[tuple[datetime.datetime, dict]]:
+    """Parse the time of each hourly price entry once."""
+    return [(dt_util.parse_datetime(entry["time"]), entry) for entry in entries]
+
+
+def _build_view(
+    parsed_entries: list[tuple[datetime.datetime, dict]],
+    today: datetime.date,
+    raw_key: str,
+    get_price,
+    with_attrs: bool = True,
+) -> PriceView:
+    """Build the view of one kind of price."""
+    tomorrow = today + datetime.timedelta(days=1)
+    prices = {}
+    local_today = []
+    local_raw_today = []
+    local_tomorrow = []
+    local_raw_tomorrow = []
+    for dt_time, entry in parsed_entries:
+        price = get_price(entry)
+        prices[epoch_hour(dt_time)] = price
+        if dt_time.date() == today:
+            local_today.append(price)
+            local_raw_today.append({"time": entry["time"], raw_key: price})
+        elif dt_time.date() == tomorrow:
+            local_tomorrow.append(price)
+            local_raw_tomorrow.append({"time": entry["time"], raw_key: price})
+    if not with_attrs:
+        return PriceView(prices, {})
+    return PriceView(
+        prices,
+        {
+            "today": local_today,
+            "raw_today": local_raw_today,
+            "tomorrow_valid": len(local_tomorrow) > 0,
+            "tomorrow": local_tomorrow,
+            "raw_tomorrow": local_raw_tomorrow,
+        },
+    )
+
+
+def build_price_views(
+    parsed_entries: list[tuple[datetime.datetime, dict]], today: datetime.date
+) -> dict[str, PriceView]:
+    """Build the energy, grid and total price views for the given day."""
+    has_grid_price = any(entry.get("gridPrice") for _, entry in parsed_entries)
+    views = {
+        "energy_price": _build_view(
+            parsed_entries, today, "total", lambda entry: entry["total"]
+        ),
+        "grid_price": _build_view(
+            parsed_entries,
+            today,
+            "gridPrice",
+            lambda entry: entry.get("gridPrice"),
+            with_attrs=has_grid_price,
+        ),
+    }
+    if has_grid_price:
+        views["total_price"] = _build_view(
+            parsed_entries,
+            today,
+            "total_with_gridPrice",
+            lambda entry: round(entry["total"] + entry["gridPrice"], 4),
+        )
+    return views
@@ -2,67 +2,109 @@
 import datetime
 import logging
 
-from homeassistant.components.sensor import SensorDeviceClass, SensorEntity
+from homeassistant.components.sensor import (
+    SensorDeviceClass,
+    SensorEntity,
+    SensorStateClass,
+)
+from homeassistant.const import EntityCategory
 from homeassistant.core import HomeAssistant, callback
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import dt as dt_util
 
-from .const import DOMAIN, SENSORS, TIBBER_APP_SENSORS
+from .const import (
+    CONF_DIAGNOSTICS,
+    DOMAIN,
+    SENSORS,
+    SIGNAL_NEW_COORDINATOR,
+    TIBBER_APP_SENSORS,
+)
+from .entity import WriteOnChangeMixin
 
 _LOGGER = logging.getLogger(__name__)
 
+# Only the diagnostic sensors are polled
+SCAN_INTERVAL = datetime.timedelta(minutes=1)
+
 
 async def async_setup_platform(hass: HomeAssistant, _, async_add_entities, config):
     """Set up the Tibber sensor."""
 
-    dev = []
-    for home in hass.data["tibber"].get_homes(only_active=True):
-        coordinator = hass.data[DOMAIN]["coordinator"][home.home_id]
-        for entity_description in SENSORS:
-            if (
-                entity_description.key in ("daily_cost_with_subsidy",)
-                and not home.has_real_time_consumption
-            ):
-                continue
+    @callback
+    def _async_add_coordinator(coordinator):
+        async_add_entities(_home_sensors(coordinator, config))
+        if not config.get("password"):
+            return
 
-            if "subsidy" in entity_description.key and home.country not in ("NO",):
-                continue
+        # The chargers and offline evs are known after the first update
+        added_keys = set()
 
-            if (
-                entity_description.key in ("production_profit_month",)
-                and not home.has_production
+        @callback
+        def _async_add_devices():
+            if coordinator.data is None:
+                return
+            dev = []
+            for entity_description in (
+                *coordinator.chargers_entity_descriptions,
+                *coordinator.offline_ev_entity_descriptions,
             ):
-                continue
+                key = entity_description.key
+                if key in added_keys or key not in coordinator.data:
+                    continue
+                added_keys.add(key)
+                dev.append(TibberDataSensor(coordinator, entity_description))
+            if dev:
+                async_add_entities(dev)
 
-            if entity_description.key in ("production_profit_day",) and (
-                not home.has_production or not home.has_real_time_consumption
-            ):
-                continue
+        _async_add_devices()
+        coordinator.async_add_listener(_async_add_devices)
 
-            dev.append(TibberDataSensor(coordinator, entity_description))
+    for coordinator in hass.data[DOMAIN]["coordinator"].values():
+        _async_add_coordinator(coordinator)
+    async_dispatcher_connect(hass, SIGNAL_NEW_COORDINATOR, _async_add_coordinator)
 
-        if config.get("password"):
-            for entity_description in TIBBER_APP_SENSORS:
-                dev.append(  # noqa: PERF401
-                    TibberDataSensor(coordinator, entity_description)
-                )
-            for (
-                chargers_entity_descriptions
-            ) in coordinator.chargers_entity_descriptions:
-                dev.append(  # noqa: PERF401
-                    TibberDataSensor(coordinator, chargers_entity_descriptions)
-                )
-            for (
-                offline_ev_entity_descriptions
-            ) in coordinator.offline_ev_entity_descriptions:
-                dev.append(  # noqa: PERF401
-                    TibberDataSensor(coordinator, offline_ev_entity_descriptions)
-                )
 
-    async_add_entities(dev)
+def _home_sensors(coordinator, config):
+    """Return the sensors of a home."""
+    home = coordinator.tibber_home
+    dev = []
+    for entity_description in SENSORS:
+        if (
+            entity_description.key in ("daily_cost_with_subsidy",)
+            and not home.has_real_time_consumption
+        ):
+            continue
+
+        if "subsidy" in entity_description.key and home.country not in ("NO",):
+            continue
+
+        if (
+            entity_description.key in ("production_profit_month",)
+            and not home.has_production
+        ):
+            continue
+
+        if entity_description.key in ("production_profit_day",) and (
+            not home.has_production or not home.has_real_time_consumption
+        ):
+            continue
 
+        dev.append(TibberDataSensor(coordinator, entity_description))
 
-class TibberDataSensor(SensorEntity, CoordinatorEntity["TibberDataCoordinator"]):
+    if config.get("password"):
+        for entity_description in TIBBER_APP_SENSORS:
+            dev.append(  # noqa: PERF401
+                TibberDataSensor(coordinator, entity_description)
+            )
+    if config.get(CONF_DIAGNOSTICS):
+        dev.append(TibberDataStatsSensor(coordinator))
+    return dev
+
+
+class TibberDataSensor(
+    WriteOnChangeMixin, SensorEntity, CoordinatorEntity["TibberDataCoordinator"]
+):
     """Representation of a Tibber sensor."""
 
     def __init__(self, coordinator, entity_description):
@@ -80,15 +122,29 @@ class TibberDataSensor(SensorEntity, CoordinatorEntity["TibberDataCoordinator"])
                     coordinator.tibber_home.price_unit
                 )
 
-        _name = self.coordinator.data.get(f"{self.entity_description.key}_name")
+        _name = (self.coordinator.data or {}).get(f"{self.entity_description.key}_name")
         if _name:
             self._attr_name = _name
         else:
             self._attr_name = f"{self.entity_description.name} {self.coordinator.tibber_home.address1}"
 
+    @property
+    def available(self) -> bool:
+        """Return if entity is available."""
+        return super().available and self.coordinator.data is not None
+
+    async def async_added_to_hass(self) -> None:
+        """When entity is added to hass."""
+        await super().async_added_to_hass()
+        if self.coordinator.data is not None:
+            self._handle_coordinator_update()
+
     @callback
     def _handle_coordinator_update(self) -> None:
         """Handle updated data from the coordinator."""
+        if self.coordinator.data is None:
+            self.async_write_ha_state_if_changed(self._attr_native_value)
+            return
         if self.entity_description.key == "subsidy":
             native_value = self.subsidy
         elif self.entity_description.key == "current_price_with_subsidy":
@@ -107,20 +163,17 @@ class TibberDataSensor(SensorEntity, CoordinatorEntity["TibberDataCoordinator"])
         self._attr_native_value = (
             round(native_value, 2) if native_value is not None else None
         )
-        if self.entity_description.key == "peak_consumption":
+        if self.entity_description.key in (
+            "peak_consumption",
+            "compare_cons",
+            "compare_cons_same_weekday",
+            "compare_cons_two_years",
+        ):
             self._attr_extra_state_attributes = self.coordinator.data.get(
-                "peak_consumption_attrs"
+                f"{self.entity_description.key}_attrs"
             )
-        elif self.entity_description.key == "compare_cons":
-            self._attr_extra_state_attributes = {}
-            self._attr_extra_state_attributes[
-                "Month consumption"
-            ] = self.coordinator.data.get("month_cons")
-            self._attr_extra_state_attributes[
-                "Month consumption last year"
-            ] = self.coordinator.data.get("prev_year_month_cons")
 
-        self.async_write_ha_state()
+        self.async_write_ha_state_if_changed(self._attr_native_value)
 
     def update_current_price_with_subsidy_sensor(self):
         """Update current_price_with_subsidy sensor."""
@@ -131,96 +184,11 @@ class TibberDataSensor(SensorEntity, CoordinatorEntity["TibberDataCoordinator"])
 
     def update_total_price_sensor(self):
         """Update total_price sensor."""
-        self._attr_extra_state_attributes = {}
-        native_value = None
-        price_info = self.coordinator.data.get("hourly_prices", {})
-        # check if data has grid prices and add to attributes if available
-        if price_info[1].get("gridPrice"):
-            # find current price
-            now_hour = dt_util.now().replace(minute=0, second=0, microsecond=0)
-            for i in price_info:
-                if dt_util.parse_datetime(i["time"]) == now_hour:
-                    native_value = round(i["total"] + i["gridPrice"], 4)
-
-            local_today = []
-            local_raw_today = []
-            local_tomorrow = []
-            local_raw_tomorrow = []
-            for entry in price_info:
-                if dt_util.parse_datetime(entry["time"]).date() == dt_util.now().date():
-                    local_today.append(round(entry["total"] + entry["gridPrice"], 4))
-                    local_raw_today.append(
-                        {
-                            "time": entry["time"],
-                            "total_with_gridPrice": round(
-                                entry["total"] + entry["gridPrice"], 4
-                            ),
-                        }
-                    )
-                if dt_util.parse_datetime(entry["time"]).date() == (
-                    dt_util.now().date() + datetime.timedelta(days=1)
-                ):
-                    local_tomorrow.append(round(entry["total"] + entry["gridPrice"], 4))
-                    local_raw_tomorrow.append(
-                        {
-                            "time": entry["time"],
-                            "total_with_gridPrice": round(
-                                entry["total"] + entry["gridPrice"], 4
-                            ),
-                        }
-                    )
-
-            self._attr_extra_state_attributes["today"] = local_today
-            self._attr_extra_state_attributes["raw_today"] = local_raw_today
-            if len(local_tomorrow) > 0:
-                self._attr_extra_state_attributes["tomorrow_valid"] = True
-            else:
-                self._attr_extra_state_attributes["tomorrow_valid"] = False
-                _LOGGER.debug("No price info for tomorrow")
-            self._attr_extra_state_attributes["tomorrow"] = local_tomorrow
-            self._attr_extra_state_attributes["raw_tomorrow"] = local_raw_tomorrow
-        else:
-            _LOGGER.debug("No grid price available, no total price to add")
-        return native_value
+        return self._update_from_price_view("total_price")
 
     def update_grid_price_sensor(self):
         """Update grid_price sensor."""
-        self._attr_extra_state_attributes = {}
-        local_today = []
-        local_raw_today = []
-        local_tomorrow = []
-        local_raw_tomorrow = []
-        price_info = self.coordinator.data.get("hourly_prices", {})
-        # check if data has grid prices and add to attributes if available
-        if price_info[1]["gridPrice"]:
-            for entry in price_info:
-                if dt_util.parse_datetime(entry["time"]).date() == dt_util.now().date():
-                    local_today.append(entry["gridPrice"])
-                    local_raw_today.append(
-                        {"time": entry["time"], "gridPrice": entry["gridPrice"]}
-                    )
-                if dt_util.parse_datetime(entry["time"]).date() == (
-                    dt_util.now().date() + datetime.timedelta(days=1)
-                ):
-                    local_tomorrow.append(entry["gridPrice"])
-                    local_raw_tomorrow.append(
-                        {"time": entry["time"], "gridPrice": entry["gridPrice"]}
-                    )
-
-            self._attr_extra_state_attributes["today"] = local_today
-            self._attr_extra_state_attributes["raw_today"] = local_raw_today
-            if len(local_tomorrow) > 0:
-                self._attr_extra_state_attributes["tomorrow_valid"] = True
-            else:
-                self._attr_extra_state_attributes["tomorrow_valid"] = False
-                _LOGGER.debug("No price info for tomorrow")
-            self._attr_extra_state_attributes["tomorrow"] = local_tomorrow
-            self._attr_extra_state_attributes["raw_tomorrow"] = local_raw_tomorrow
-        else:
-            _LOGGER.debug("No grid price available")
-        return self.coordinator.data.get(self.entity_description.key, {}).get(
-            dt_util.now().replace(minute=0, second=0, microsecond=0)
-        )
+        return self._update_from_price_view("grid_price")
 
     @property
     def subsidy(self):
@@ -231,49 +199,64 @@ class TibberDataSensor(SensorEntity, CoordinatorEntity["TibberDataCoordinator"])
         """Update energy_total_price_with_subsidy sensor."""
         if self.subsidy is None:
             return None
-        grid_price = self.coordinator.data.get("grid_price", {}).get(
-            dt_util.now().replace(minute=0, second=0, microsecond=0)
-        )
+        now = dt_util.now()
+        grid_price = self.coordinator.get_price_view("grid_price").price_at(now)
         if grid_price is None:
             return None
-        price = self.coordinator.get_price_at(dt_util.now())
+        price = self.coordinator.get_price_at(now)
         if price is None:
             return None
         return grid_price + price - self.subsidy
 
     def update_energy_price_sensor(self):
         """Update energy_price sensor."""
-        self._attr_extra_state_attributes = {}
-        price_info = self.coordinator.data.get("hourly_prices", {})
-        # find current price
-        now_hour = dt_util.now().replace(minute=0, second=0, microsecond=0)
-        native_value = None
-        for i in price_info:
-            if dt_util.parse_datetime(i["time"]) == now_hour:
-                native_value = i["total"]
-                break
-        local_today = []
-        local_raw_today = []
-        local_tomorrow = []
-        local_raw_tomorrow = []
-        for entry in price_info:
-            if dt_util.parse_datetime(entry["time"]).date() == dt_util.now().date():
-                local_today.append(entry["total"])
-                local_raw_today.append({"time": entry["time"], "total": entry["total"]})
-            if dt_util.parse_datetime(entry["time"]).date() == (
-                dt_util.now().date() + datetime.timedelta(days=1)
-            ):
-                local_tomorrow.append(entry["total"])
-                local_raw_tomorrow.append(
-                    {"time": entry["time"], "total": entry["total"]}
-                )
-        self._attr_extra_state_attributes["today"] = local_today
-        self._attr_extra_state_attributes["raw_today"] = local_raw_today
-        if len(local_tomorrow) > 0:
-            self._attr_extra_state_attributes["tomorrow_valid"] = True
-        else:
-            self._attr_extra_state_attributes["tomorrow_valid"] = False
-            _LOGGER.debug("No price info for tomorrow")
-        self._attr_extra_state_attributes["tomorrow"] = local_tomorrow
-        self._attr_extra_state_attributes["raw_tomorrow"] = local_raw_tomorrow
-        return native_value
+        return self._update_from_price_view("energy_price")
+
+    def _update_from_price_view(self, key):
+        """Set the attributes from a price view and return the current price."""
+        price_view = self.coordinator.get_price_view(key)
+        self._attr_extra_state_attributes = price_view.attrs
+        return price_view.price_at(dt_util.now())
+
+
+class TibberDataStatsSensor(CoordinatorEntity["TibberDataCoordinator"], SensorEntity):
+    """Diagnostic sensor with the API calls made by the updates of a home."""
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+    _attr_state_class = SensorStateClass.TOTAL_INCREASING
+    _unrecorded_attributes = frozenset(
+        {
+            "functions",
+            "history_fetcher",
+            "state_writes",
+            "skipped_state_writes",
+            "circuit_breakers",
+        }
+    )
+
+    def __init__(self, coordinator):
+        """Initialize the sensor."""
+        super().__init__(coordinator=coordinator)
+        self._attr_unique_id = f"{coordinator.tibber_home.home_id}_api_calls"
+        self._attr_name = f"API calls {coordinator.tibber_home.address1}"
+        self._update_from_stats()
+
+    @property
+    def should_poll(self) -> bool:
+        """Poll the counters, which change without new coordinator data."""
+        return True
+
+    async def async_update(self) -> None:
+        """Read the counters, without refreshing the coordinator."""
+        self._update_from_stats()
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        """Handle updated data from the coordinator."""
+        self._update_from_stats()
+        self.async_write_ha_state()
+
+    def _update_from_stats(self):
+        """Set the state from the counters of the coordinator."""
+        self._attr_native_value = self.coordinator.update_stats.api_calls
+        self._attr_extra_state_attributes = self.coordinator.diagnostics
@@ -1,26 +1,132 @@
 """Helpers for the Tibber integration."""
+import asyncio
 import base64
 import datetime
+import gzip
 import json
 import logging
+import re
 
+import aiohttp
 import tibber
+from homeassistant.core import HomeAssistant
+from homeassistant.util.json import json_loads
+from yarl import URL
 
-TIBBER_API = "https://app.tibber.com/v4/gql"
+from .consumption_data import parse_consumption_nodes
+from .instrumentation import api_call
+
+TIBBER_APP_URL = "https://app.tibber.com"
+TIBBER_API = "/v4/gql"
+TIBBER_LOGIN = "/v1/login.credentials"
+
+DEFAULT_CONNECTION_LIMIT = 4
+REQUEST_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10)
 
 _LOGGER = logging.getLogger(__name__)
 
 
-async def get_historic_data(
-    tibber_home: tibber.TibberHome, tibber_controller: tibber.Tibber
+def create_session(
+    connection_limit: int = DEFAULT_CONNECTION_LIMIT, app_url: str = TIBBER_APP_URL
 ):
-    """Get historic data."""
-    # pylint: disable=consider-using-f-string
-    query = """
+    """Create the session shared by all homes for the Tibber app API."""
+    # The session joins the relative paths of the app API to its base url,
+    # which aiohttp only accepts without a path.
+    url = URL(app_url)
+    if not url.is_absolute() or url.origin() != url:
+        raise ValueError(f"The app url must be a scheme and host only: {app_url}")
+    return aiohttp.ClientSession(
+        base_url=app_url,
+        connector=aiohttp.TCPConnector(
+            limit_per_host=connection_limit,
+            keepalive_timeout=60,
+            ttl_dns_cache=300,
+        ),
+        timeout=REQUEST_TIMEOUT,
+    )
+
+
+class TibberAuthError(Exception):
+    """The Tibber app API rejected the credentials or token."""
+
+
+class TibberPublicApi:
+    """Run the queries of this integration on the public Tibber API."""
+
+    def __init__(
+        self,
+        tibber_controller: tibber.Tibber,
+        url: str | None = None,
+        access_token: str | None = None,
+    ):
+        """Initialize the API."""
+        if url is not None and access_token is None:
+            raise ValueError("An access token is needed to use another url")
+        self._tibber_controller = tibber_controller
+        self._url = url
+        self._access_token = access_token
+
+    async def execute(self, query: str) -> dict | None:
+        """Execute a GraphQL query and return the data."""
+        if self._url is None:
+            return await self._tibber_controller.execute(query)
+        async with self._tibber_controller.websession.post(
+            self._url,
+            json={"query": query, "variables": {}},
+            headers={"Authorization": f"Bearer {self._access_token}"},
+            timeout=REQUEST_TIMEOUT,
+        ) as resp:
+            resp.raise_for_status()
+            res = await resp.json(loads=json_loads)
+        return res.get("data")
+
+
+def _is_auth_error(res) -> bool:
+    """Return True if a GraphQL response was rejected as unauthenticated."""
+    if not isinstance(res, dict):
+        return False
+    return any(
+        (error.get("extensions") or {}).get("code") == "UNAUTHENTICATED"
+        for error in res.get("errors") or []
+    )
+
+
+async def _post(session: aiohttp.ClientSession, url: str, call: str, **post_args):
+    """Post to the Tibber app API and return the decoded response."""
+    with api_call(call) as stats:
+        async with session.post(url, **post_args) as resp:
+            if resp.status in (401, 403):
+                raise TibberAuthError(f"Status {resp.status} from {url}")
+            body = await resp.read()
+        stats.n_bytes = len(body)
+        res = json_loads(body)
+        if _is_auth_error(res):
+            raise TibberAuthError(f"Unauthenticated response from {url}")
+    return res
+
+
+HISTORY_PAGE_SIZE = 744
+
+
+async def iter_historic_data(
+    tibber_home: tibber.TibberHome,
+    tibber_controller: tibber.Tibber | TibberPublicApi,
+    start: datetime.datetime,
+    page_size: int = HISTORY_PAGE_SIZE,
+    retries: int = 3,
+):
+    """Yield the hourly ConsumptionNode tuples after start, a page at a time."""
+    cursor = base64.b64encode(start.isoformat().encode("ascii")).decode()
+    while True:
+        query = f"""
             {{
               viewer {{
-                home(id: "{}") {{
-                  consumption(resolution: HOURLY, last: 9600, before:"{}") {{
+                home(id: "{tibber_home.home_id}") {{
+                  consumption(resolution: HOURLY, first: {page_size}, after:"{cursor}") {{
+                    pageInfo {{
+                      endCursor
+                      hasNextPage
+                    }}
                     nodes {{
                       consumption
                       cost
@@ -31,50 +137,68 @@ async def get_historic_data(
                 }}
               }}
             }}
-      """.format(
-        tibber_home.home_id,
-        base64.b64encode(datetime.datetime.now().isoformat().encode("ascii")).decode(),
-    )
+        """
+        for attempt in range(retries):
+            try:
+                with api_call("history_page"):
+                    data = await tibber_controller.execute(query)
+            except Exception:  # pylint: disable=broad-except
+                if attempt == retries - 1:
+                    raise
+                _LOGGER.debug("Error fetching history page, retrying", exc_info=True)
+            else:
+                if data:
+                    break
+            if attempt < retries - 1:
+                await asyncio.sleep(2**attempt)
+        else:
+            _LOGGER.error("Could not find the data.")
+            return
 
-    if not (data := await tibber_controller.execute(query)):
-        _LOGGER.error("Could not find the data.")
-        return None
-    data = data["viewer"]["home"]["consumption"]
-    if data is None:
-        return None
-    return data["nodes"]
+        consumption = data["viewer"]["home"]["consumption"]
+        if consumption is None or not consumption["nodes"]:
+            return
+        yield parse_consumption_nodes(consumption["nodes"])
+        page_info = consumption["pageInfo"]
+        if not page_info["hasNextPage"] or not page_info["endCursor"]:
+            return
+        cursor = page_info["endCursor"]
+
+
+HISTORY_FIELDS = {
+    "consumption": "consumption cost from unitPrice",
+    "production": "from profit",
+}
 
 
-async def get_historic_production_data(
-    tibber_home: tibber.TibberHome, tibber_controller: tibber.Tibber
+async def get_historic_data_batch(
+    tibber_controller: tibber.Tibber | TibberPublicApi,
+    requests: list[tuple[str, str, int]],
 ):
-    """Get historic data."""
-    # pylint: disable=consider-using-f-string
-    query = """
-            {{
-              viewer {{
-                home(id: "{}") {{
-                  production(resolution: HOURLY, last: 744, before:"{}") {{
-                    nodes {{
-                        from
-                        profit
-                    }}
-                  }}
-                }}
-              }}
-            }}
-      """.format(
-        tibber_home.home_id,
-        base64.b64encode(datetime.datetime.now().isoformat().encode("ascii")).decode(),
-    )
+    """Get historic data for several homes in one request."""
+    before = base64.b64encode(
+        datetime.datetime.now().isoformat().encode("ascii")
+    ).decode()
+    fields = [
+        f'r{k}: home(id: "{home_id}") {{ {kind}(resolution: HOURLY, last: {last},'
+        f' before: "{before}") {{ nodes {{ {HISTORY_FIELDS[kind]} }} }} }}'
+        for k, (kind, home_id, last) in enumerate(requests)
+    ]
+    query = f"{{ viewer {{ {' '.join(fields)} }} }}"
 
-    if not (data := await tibber_controller.execute(query)):
+    with api_call("history_batch"):
+        data = await tibber_controller.execute(query)
+    if not data:
         _LOGGER.error("Could not find the data.")
-        return None
-    data = data["viewer"]["home"]["production"]
-    if data is None:
-        return None
-    return data["nodes"]
+        return [None] * len(requests)
+    res = []
+    for k, (kind, _, _) in enumerate(requests):
+        home = data["viewer"].get(f"r{k}") or {}
+        nodes = (home.get(kind) or {}).get("nodes")
+        if nodes is not None and kind == "consumption":
+            nodes = parse_consumption_nodes(nodes)
+        res.append(nodes)
+    return res
 
 
 async def get_tibber_token(session, email: str, password: str):
@@ -85,10 +209,7 @@ async def get_tibber_token(session, email: str, password: str):
         },
         "data": json.dumps({"email": email, "password": password}),
     }
-    resp = await session.post(
-        "https://app.tibber.com/v1/login.credentials", **post_args
-    )
-    res = await resp.json()
+    res = await _post(session, TIBBER_LOGIN, "login", **post_args)
     return res.get("token")
 
 
@@ -108,8 +229,7 @@ async def get_tibber_data(session, token: str):
             }
         ),
     }
-    resp = await session.post("https://app.tibber.com/v4/gql", **post_args)
-    return await resp.json()
+    return await _post(session, TIBBER_API, "prices", **post_args)
 
 
 async def get_tibber_chargers(session, token: str, home_id: str):
@@ -124,13 +244,8 @@ async def get_tibber_chargers(session, token: str, home_id: str):
         ),
     }
 
-    resp = await session.post("https://app.tibber.com/v4/gql", **post_args)
-    res = []
-    for bubble in (await resp.json())["data"]["me"]["home"]["bubbles"]:
-        _LOGGER.debug("Found device: %s", bubble)
-        if bubble["type"] == "ev-charger":
-            res.append(bubble["id"])
-    return res
+    data = await _post(session, TIBBER_API, "chargers", **post_args)
+    return _charger_bubbles(data["data"]["me"]["home"]["bubbles"])
 
 
 async def get_tibber_chargers_data(
@@ -156,8 +271,8 @@ async def get_tibber_chargers_data(
         ),
     }
 
-    resp = await session.post(TIBBER_API, **post_args)
-    meta_data = (await resp.json())["data"]["me"]["home"]["evCharger"]
+    resp = await _post(session, TIBBER_API, "charger", **post_args)
+    meta_data = resp["data"]["me"]["home"]["evCharger"]
 
     # pylint: disable=consider-using-f-string
     post_args = {
@@ -177,14 +292,79 @@ async def get_tibber_chargers_data(
             }
         ),
     }
-    resp = await session.post(TIBBER_API, **post_args)
-    charger_consumption = (await resp.json())["data"]["me"]["home"][
-        "evChargerConsumption"
-    ]
+    resp = await _post(session, TIBBER_API, "charger_consumption", **post_args)
+    charger_consumption = resp["data"]["me"]["home"]["evChargerConsumption"]
 
     return {"meta_data": meta_data, "charger_consumption": charger_consumption}
 
 
+def _charger_bubbles(bubbles: list[dict]) -> list[str]:
+    """Return the ids of the ev chargers among the devices of a home."""
+    res = []
+    for bubble in bubbles:
+        _LOGGER.debug("Found device: %s", bubble)
+        if bubble["type"] == "ev-charger":
+            res.append(bubble["id"])
+    return res
+
+
+def _charger_fields(k: int, charger_id: str, month_start: str) -> list[str]:
+    """Return the aliased fields of a charger in a batched query."""
+    return [
+        f'c{k}: evCharger(id: "{charger_id}") {{ name lastSeen'
+        " settingsScreen { settings { key value } }"
+        " state { cableIsLocked isCharging permanentCableLock } }",
+        f'c{k}_consumption: evChargerConsumption(id: "{charger_id}"'
+        f' resolution: "DAILY" from: "{month_start}")'
+        " { from consumption energyCost }",
+    ]
+
+
+def _parse_charger_fields(home: dict, charger_ids: list[str]) -> dict[str, dict]:
+    """Return the data of the chargers whose aliased fields are not empty."""
+    charger_data = {}
+    for k, charger_id in enumerate(charger_ids):
+        meta_data = home.get(f"c{k}")
+        charger_consumption = home.get(f"c{k}_consumption")
+        if meta_data is None or charger_consumption is None:
+            continue
+        charger_data[charger_id] = {
+            "meta_data": meta_data,
+            "charger_consumption": charger_consumption,
+        }
+    return charger_data
+
+
+async def get_tibber_chargers_data_batch(
+    session,
+    token: str,
+    home_id: str,
+    charger_ids: list[str],
+    include_chargers: bool = False,
+):
+    """Get data for several chargers of a home in one request."""
+    now = datetime.datetime.now()
+    month_start = f"{now.year}-{now.month:02d}-01T00:00:00+0200"
+    fields = ["bubbles { type id }"] if include_chargers else []
+    for k, charger_id in enumerate(charger_ids):
+        fields.extend(_charger_fields(k, charger_id, month_start))
+    query = f'{{ me {{ home(id: "{home_id}") {{ {" ".join(fields)} }} }} }}'
+    post_args = {
+        "headers": {"content-type": "application/json", "cookie": f"token={token}"},
+        "data": json.dumps({"variables": {}, "query": query}),
+    }
+    resp = await _post(session, TIBBER_API, "chargers_batch", **post_args)
+    if errors := resp.get("errors"):
+        _LOGGER.debug("Errors in batched charger query: %s", errors)
+    home = ((resp.get("data") or {}).get("me") or {}).get("home")
+    if home is None:
+        raise ValueError(f"No charger data for home {home_id}")
+    return {
+        "chargers": _charger_bubbles(home["bubbles"]) if include_chargers else None,
+        "charger_data": _parse_charger_fields(home, charger_ids),
+    }
+
+
 async def get_tibber_offline_evs_data(
     session,
     token: str,
@@ -199,9 +379,8 @@ async def get_tibber_offline_evs_data(
             }
         ),
     }
-    resp = await session.post(TIBBER_API, **post_args)
-
-    data = (await resp.json())["data"]["me"]["myVehicles"]["vehicles"]
+    resp = await _post(session, TIBBER_API, "offline_evs", **post_args)
+    data = resp["data"]["me"]["myVehicles"]["vehicles"]
 
     res = []
     for ev_raw in data:
@@ -241,5 +420,164 @@ async def update_offline_evs_soc(
             }
         ),
     }
-    await session.post(TIBBER_API, **post_args)
+    await _post(session, TIBBER_API, "update_soc", **post_args)
     return True
+
+
+SCRUBBED = "scrubbed"
+RECORD_FLUSH_SIZE = 20
+# Cursors and start times change from one update to the next
+_VOLATILE_ARGS = re.compile(r'\b(after|before|from): ?"[^"]*"')
+_CREDENTIALS = ("email", "password", "token")
+_HOME_ATTRIBUTES = (
+    "home_id",
+    "name",
+    "address1",
+    "country",
+    "currency",
+    "price_unit",
+    "has_production",
+    "has_real_time_consumption",
+    "price_total",
+)
+
+
+def traffic_key(url: str, query: str) -> str:
+    """Return the key matching a recorded request with a later one."""
+    query = _VOLATILE_ARGS.sub(r'\1: ""', query)
+    return " ".join([url, *query.split()])
+
+
+def _scrub(data):
+    """Replace the credentials in a request or response body."""
+    if not isinstance(data, dict):
+        return data
+    return {
+        key: SCRUBBED if key in _CREDENTIALS else value for key, value in data.items()
+    }
+
+
+class TrafficRecorder:
+    """Write the requests to the Tibber APIs and their responses to a file."""
+
+    # Credentials and tokens are scrubbed, but home ids, addresses and
+    # consumption are kept, so the file still holds personal data.
+
+    def __init__(self, hass: HomeAssistant, path: str):
+        """Initialize the recorder."""
+        self.path = path
+        self._hass = hass
+        self._pending: list[dict] = []
+        self._lock = asyncio.Lock()
+        self._flush_task: asyncio.Task | None = None
+
+    def add(self, record: dict):
+        """Add a record, writing them to the file in batches."""
+        self._pending.append(record)
+        if len(self._pending) >= RECORD_FLUSH_SIZE and (
+            self._flush_task is None or self._flush_task.done()
+        ):
+            self._flush_task = self._hass.async_create_task(self.async_flush())
+
+    def add_app(self, url: str, data: str | None, status: int, body: bytes | None):
+        """Add a request to the app API."""
+        request = _scrub(json_loads(data)) if data else None
+        response = None
+        if body is not None:
+            try:
+                response = _scrub(json_loads(body))
+            except ValueError:
+                response = body.decode(errors="replace")
+        self.add(
+            {
+                "api": "app",
+                "url": url,
+                "request": request,
+                "status": status,
+                "response": response,
+            }
+        )
+
+    def add_home(self, tibber_home: tibber.TibberHome):
+        """Add the attributes of a home used by the coordinator."""
+        self.add(
+            {
+                "api": "home",
+                "home": {key: getattr(tibber_home, key) for key in _HOME_ATTRIBUTES},
+            }
+        )
+
+    async def async_flush(self):
+        """Write the pending records, in the order they were added."""
+        async with self._lock:
+            records, self._pending = self._pending, []
+            if records:
+                await self._hass.async_add_executor_job(self._write, records)
+
+    def _write(self, records: list[dict]):
+        with gzip.open(self.path, "at", encoding="utf-8") as file:
+            file.writelines(json.dumps(record) + "\n" for record in records)
+
+
+class _RecordingResponse:
+    """Response of a recorded request to the app API."""
+
+    def __init__(self, request, recorder: TrafficRecorder, url: str, data):
+        self._request = request
+        self._recorder = recorder
+        self._url = url
+        self._data = data
+        self._resp: aiohttp.ClientResponse | None = None
+        self._body: bytes | None = None
+        self.status = 0
+
+    async def __aenter__(self):
+        self._resp = await self._request.__aenter__()
+        self.status = self._resp.status
+        return self
+
+    async def __aexit__(self, *args):
+        await self._request.__aexit__(*args)
+        self._recorder.add_app(self._url, self._data, self.status, self._body)
+
+    async def read(self) -> bytes:
+        """Read the response body."""
+        self._body = await self._resp.read()
+        return self._body
+
+
+class RecordingSession:
+    """Session of the app API, recording the requests and responses."""
+
+    def __init__(self, session: aiohttp.ClientSession, recorder: TrafficRecorder):
+        """Initialize the session."""
+        self._session = session
+        self._recorder = recorder
+
+    def post(self, url: str, **post_args) -> _RecordingResponse:
+        """Post a request to the app API."""
+        return _RecordingResponse(
+            self._session.post(url, **post_args),
+            self._recorder,
+            url,
+            post_args.get("data"),
+        )
+
+    async def close(self):
+        """Close the session."""
+        await self._session.close()
+
+
+class RecordingPublicApi:
+    """Public API, recording the queries and their data."""
+
+    def __init__(self, api: TibberPublicApi, recorder: TrafficRecorder):
+        """Initialize the API."""
+        self._api = api
+        self._recorder = recorder
+
+    async def execute(self, query: str) -> dict | None:
+        """Execute a GraphQL query and return the data."""
+        data = await self._api.execute(query)
+        self._recorder.add({"api": "public", "request": query, "response": data})
+        return data
@@ -0,0 +1,104 @@
+"""Login token for the Tibber app API, shared by all homes of an account."""
+import asyncio
+import base64
+import datetime
+import json
+import logging
+
+import aiohttp
+from homeassistant.core import HomeAssistant
+from homeassistant.helpers.storage import Store
+from homeassistant.util import dt as dt_util
+from homeassistant.util import slugify
+
+from .const import DOMAIN
+from .tibber_api import TibberAuthError, get_tibber_token
+
+STORAGE_VERSION = 1
+REFRESH_MARGIN = datetime.timedelta(minutes=10)
+
+_LOGGER = logging.getLogger(__name__)
+
+
+def token_expiry(token: str) -> datetime.datetime | None:
+    """Return the expiry time of a JWT token, if it can be decoded."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        exp = json.loads(base64.urlsafe_b64decode(payload))["exp"]
+        return dt_util.utc_from_timestamp(exp)
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+
+class TibberTokenManager:
+    """Keep one valid login token per account."""
+
+    def __init__(
+        self,
+        hass: HomeAssistant,
+        session: aiohttp.ClientSession,
+        email: str,
+        password: str,
+    ):
+        """Initialize the token manager."""
+        self.email = email
+        self._password = password
+        self._session = session
+        self._store: Store = Store(
+            hass, STORAGE_VERSION, f"{DOMAIN}.token_{slugify(email)}"
+        )
+        self._lock = asyncio.Lock()
+        self._loaded = False
+        self._token: str | None = None
+        self._expires: datetime.datetime | None = None
+
+    @property
+    def token(self) -> str | None:
+        """Return the current token."""
+        return self._token
+
+    def _is_valid(self) -> bool:
+        """Return True if the token can be used for a while."""
+        if self._token is None:
+            return False
+        if self._expires is None:
+            return True
+        return dt_util.utcnow() < self._expires - REFRESH_MARGIN
+
+    async def async_get_token(self) -> str | None:
+        """Return a valid token, logging in if needed."""
+        if self._is_valid():
+            return self._token
+        async with self._lock:
+            if not self._loaded:
+                self._loaded = True
+                if stored := await self._store.async_load():
+                    self._set_token(stored.get("token"))
+            if self._is_valid():
+                return self._token
+
+            try:
+                token = await get_tibber_token(
+                    self._session, self.email, self._password
+                )
+            except TibberAuthError:
+                _LOGGER.error("Could not log in to Tibber, check email and password")
+                return None
+            if token is None:
+                return None
+            self._set_token(token)
+            await self._store.async_save({"token": token})
+            return token
+
+    def _set_token(self, token: str | None):
+        """Set the token and its expiry time."""
+        self._token = token
+        self._expires = token_expiry(token) if token else None
+
+    def invalidate(self, token: str):
+        """Drop the token after the API has rejected it."""
+        if token != self._token:
+            return
+        _LOGGER.debug("Tibber token rejected")
+        self._set_token(None)
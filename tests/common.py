@@ -0,0 +1,71 @@
+"""Helpers for the tests."""
+import datetime
+import math
+import random
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.tibber_data.consumption_data import ConsumptionNode
+
+# Around month, year and DST boundaries in Europe/Oslo
+NOW_TIMES = [
+    (2023, 3, 28, 15, 30),
+    (2024, 3, 31, 22, 5),
+    (2023, 10, 29, 12, 5),
+    (2024, 1, 1, 0, 30),
+    (2024, 1, 15, 12, 5),
+]
+
+
+def local_time(now_time: tuple) -> datetime.datetime:
+    """Return a time in the default time zone."""
+    return datetime.datetime(*now_time, tzinfo=dt_util.DEFAULT_TIME_ZONE)
+
+
+def make_nodes(
+    hours: int, now: datetime.datetime, rnd: random.Random
+) -> list[ConsumptionNode]:
+    """Return random hourly nodes ending at the hour before now."""
+    end = now.astimezone(datetime.timezone.utc).replace(
+        minute=0, second=0, microsecond=0
+    )
+    nodes = []
+    for k in range(hours, 0, -1):
+        start = dt_util.as_local(end - datetime.timedelta(hours=k))
+        if rnd.random() < 0.01:
+            nodes.append(ConsumptionNode(start.isoformat(), None, None, None))
+            continue
+        cons = round(rnd.uniform(0, 8), 3)
+        price = round(rnd.uniform(0, 4), 4) if rnd.random() > 0.02 else None
+        cost = round(cons * price, 4) if price is not None else None
+        nodes.append(ConsumptionNode(start.isoformat(), cons, cost, price))
+    return nodes
+
+
+def same(val_a, val_b) -> bool:
+    """Return True if two statistics are equal, up to float rounding."""
+    if isinstance(val_a, dict) and isinstance(val_b, dict):
+        return val_a.keys() == val_b.keys() and all(
+            same(val_a[key], val_b[key]) for key in val_a
+        )
+    if isinstance(val_a, list) and isinstance(val_b, list):
+        return len(val_a) == len(val_b) and all(map(same, val_a, val_b))
+    if isinstance(val_a, float) or isinstance(val_b, float):
+        return math.isclose(val_a, val_b, rel_tol=1e-9, abs_tol=1e-9)
+    return val_a == val_b
+
+
+def rescan_peaks(nodes, now: datetime.datetime) -> list[tuple[float, str]]:
+    """Return the highest hour of the three highest days, scanning the month."""
+    day_max: dict[datetime.date, tuple[float, str]] = {}
+    for node in nodes:
+        date = dt_util.as_local(dt_util.parse_datetime(node.start))
+        if node.consumption is None or (date.year, date.month) != (
+            now.year,
+            now.month,
+        ):
+            continue
+        day_max[date.date()] = max(
+            day_max.get(date.date(), (0, "")), (node.consumption, node.start)
+        )
+    return sorted(day_max.values(), reverse=True)[:3]
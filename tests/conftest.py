@@ -0,0 +1,34 @@
+"""Fixtures for the tests."""
+import asyncio
+
+import pytest
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+
+@pytest.fixture(autouse=True)
+def time_zone():
+    """Run the tests in the Norwegian time zone."""
+    default = dt_util.DEFAULT_TIME_ZONE
+    dt_util.set_default_time_zone(dt_util.get_time_zone("Europe/Oslo"))
+    yield
+    dt_util.set_default_time_zone(default)
+
+
+@pytest.fixture
+def run_in_hass(tmp_path):
+    """Return a runner of coroutines with a Home Assistant started on tmp_path."""
+
+    def _run(test):
+        # Each run starts a new instance on the same folder, like a restart
+        async def _main():
+            hass = HomeAssistant(str(tmp_path))
+            hass.config.set_time_zone("Europe/Oslo")
+            try:
+                return await test(hass)
+            finally:
+                await hass.async_stop(force=True)
+
+        return asyncio.run(_main())
+
+    return _run
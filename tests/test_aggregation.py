@@ -0,0 +1,51 @@
+"""Tests of the consumption aggregation."""
+import random
+
+import pytest
+
+from custom_components.tibber_data.aggregation import (
+    RollingConsumptionAggregator,
+    aggregate_consumption,
+)
+from custom_components.tibber_data.consumption_data import ConsumptionNode
+
+from .common import NOW_TIMES, local_time, make_nodes, same
+
+HOURS = 2 * 8760 + 1000
+STATE_ATTRS = (
+    "month_consumption",
+    "consumption_yesterday_available",
+    "consumption_prev_hour_available",
+    "prices_tomorrow_available",
+)
+
+
+@pytest.mark.parametrize("now_time", NOW_TIMES)
+def test_rolling_parity(now_time):
+    """The rolling totals match a full aggregation after new and corrected hours."""
+    now = local_time(now_time)
+    rnd = random.Random(2)
+    nodes = make_nodes(HOURS, now, rnd)
+    stored, fetched = nodes[:-48], nodes[-48:]
+    # Corrections of stored hours, some of them in the previous month and
+    # some with the consumption removed
+    for node in rnd.sample(stored[-1000:], 40):
+        cons = round(rnd.uniform(0, 8), 3) if rnd.random() > 0.2 else None
+        fetched.append(ConsumptionNode(node.start, cons, node.cost, node.unit_price))
+    prices = {node.start: node.unit_price for node in fetched if node.unit_price}
+
+    rolling = RollingConsumptionAggregator(now)
+    rolling.seed(aggregate_consumption(stored, {}, now))
+    for node in fetched:
+        rolling.update([node])
+    rolling.set_now(now, prices)
+
+    final = {node.start: node for node in stored}
+    final.update((node.start, node) for node in fetched)
+    full = aggregate_consumption(final.values(), prices, now)
+    for attr in STATE_ATTRS:
+        assert getattr(full, attr) == getattr(rolling, attr), attr
+    full_stats, rolling_stats = full.stats(), rolling.stats()
+    assert full_stats.keys() == rolling_stats.keys()
+    for key, value in full_stats.items():
+        assert same(value, rolling_stats[key]), key
@@ -0,0 +1,99 @@
+"""Tests of the backoff and the circuit breakers."""
+import datetime
+
+import pytest
+
+from custom_components.tibber_data import backoff
+from custom_components.tibber_data.backoff import (
+    BACKOFF_BASE,
+    BACKOFF_CAP,
+    FAILURE_THRESHOLD,
+    OPEN_TIME,
+    PROBE_TIMEOUT,
+    CircuitBreaker,
+    full_jitter,
+)
+
+NOW = datetime.datetime(2024, 3, 1, 12, 0, tzinfo=datetime.timezone.utc)
+
+
+@pytest.mark.parametrize(
+    ("failures", "ceiling"),
+    [
+        (0, BACKOFF_BASE),
+        (1, BACKOFF_BASE),
+        (2, 2 * BACKOFF_BASE),
+        (4, 8 * BACKOFF_BASE),
+        (100, BACKOFF_CAP),
+    ],
+)
+def test_full_jitter_bounds(monkeypatch, failures, ceiling):
+    """The delay is drawn between zero and the capped exponential ceiling."""
+    monkeypatch.setattr(backoff, "random", lambda: 0.0)
+    assert full_jitter(failures) == datetime.timedelta(0)
+    monkeypatch.setattr(backoff, "random", lambda: 0.999999)
+    delay = full_jitter(failures)
+    assert ceiling * 0.99 < delay < ceiling
+
+
+def open_breaker() -> CircuitBreaker:
+    """Return a breaker opened at NOW."""
+    breaker = CircuitBreaker("test")
+    for _ in range(FAILURE_THRESHOLD - 1):
+        breaker.record_failure(NOW)
+        assert breaker.allow(NOW)
+    breaker.record_failure(NOW)
+    return breaker
+
+
+def test_breaker_opens_after_threshold():
+    """Consecutive failures open the breaker, a success in between resets them."""
+    breaker = CircuitBreaker("test")
+    for _ in range(FAILURE_THRESHOLD - 1):
+        breaker.record_failure(NOW)
+    breaker.record_success()
+    breaker.record_failure(NOW)
+    assert not breaker.is_open
+
+    breaker = open_breaker()
+    assert breaker.is_open
+    assert breaker.open_until == NOW + OPEN_TIME
+    assert not breaker.allow(NOW + OPEN_TIME / 2)
+    # A call started before the breaker opened does not extend it
+    breaker.record_failure(NOW + OPEN_TIME / 2)
+    assert breaker.open_until == NOW + OPEN_TIME
+
+
+def test_breaker_half_open_lets_one_probe_through():
+    """After the open time, a single probe is allowed until it times out."""
+    breaker = open_breaker()
+    later = NOW + OPEN_TIME
+    assert breaker.allow(later)
+    assert not breaker.allow(later)
+    assert not breaker.allow(later + PROBE_TIMEOUT / 2)
+    # A probe that never finishes is replaced by another one
+    assert breaker.allow(later + PROBE_TIMEOUT)
+
+
+def test_breaker_closes_after_successful_probe():
+    """A successful probe closes the breaker."""
+    breaker = open_breaker()
+    later = NOW + OPEN_TIME
+    assert breaker.allow(later)
+    breaker.record_success()
+    assert not breaker.is_open
+    assert breaker.failures == 0
+    assert breaker.allow(later)
+    assert breaker.allow(later)
+
+
+def test_breaker_reopens_longer_after_failed_probe():
+    """A failed probe opens the breaker again, for twice as long."""
+    breaker = open_breaker()
+    later = NOW + OPEN_TIME
+    assert breaker.allow(later)
+    breaker.record_failure(later)
+    assert breaker.trips == 2
+    assert breaker.open_until == later + 2 * OPEN_TIME
+    assert not breaker.allow(later + OPEN_TIME)
+    assert breaker.allow(later + 2 * OPEN_TIME)
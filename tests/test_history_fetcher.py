@@ -0,0 +1,83 @@
+"""Tests of the shared history fetcher."""
+import asyncio
+
+import pytest
+
+from custom_components.tibber_data import history_fetcher
+from custom_components.tibber_data.backoff import CircuitBreaker
+from custom_components.tibber_data.history_fetcher import (
+    MAX_BATCH_HOURS,
+    HistoryFetcher,
+)
+
+
+@pytest.fixture
+def batches(monkeypatch):
+    """Replace the batched query with one recording its requests."""
+    sent: list[list[tuple[str, str, int]]] = []
+
+    async def _get_historic_data_batch(_tibber_controller, requests):
+        sent.append(requests)
+        if any(home_id == "broken" for _, home_id, _ in requests):
+            raise RuntimeError("query failed")
+        return [f"{kind} {home_id}" for kind, home_id, _ in requests]
+
+    monkeypatch.setattr(history_fetcher, "BATCH_DELAY", 0)
+    monkeypatch.setattr(
+        history_fetcher, "get_historic_data_batch", _get_historic_data_batch
+    )
+    return sent
+
+
+def test_requests_are_coalesced(run_in_hass, batches):
+    """The requests of all homes made together are sent in one query."""
+
+    async def _test(hass):
+        fetcher = HistoryFetcher(hass, None, CircuitBreaker("test"))
+        return await asyncio.gather(
+            fetcher.async_get_consumption("a", 48),
+            fetcher.async_get_production("a", 48),
+            fetcher.async_get_consumption("b", 24),
+        )
+
+    assert run_in_hass(_test) == ["consumption a", "production a", "consumption b"]
+    assert batches == [
+        [("consumption", "a", 48), ("production", "a", 48), ("consumption", "b", 24)]
+    ]
+
+
+def test_large_requests_are_split(run_in_hass, batches):
+    """A batch holds at most MAX_BATCH_HOURS hours."""
+    hours = MAX_BATCH_HOURS // 2
+
+    async def _test(hass):
+        fetcher = HistoryFetcher(hass, None, CircuitBreaker("test"))
+        return await asyncio.gather(
+            *(fetcher.async_get_consumption(home_id, hours) for home_id in "abc")
+        )
+
+    assert run_in_hass(_test) == ["consumption a", "consumption b", "consumption c"]
+    assert batches == [
+        [("consumption", "a", hours), ("consumption", "b", hours)],
+        [("consumption", "c", hours)],
+    ]
+
+
+def test_failed_batch_fails_each_request_once(run_in_hass, batches):
+    """Every home of a failed batch gets the error, counted once by the breaker."""
+
+    async def _test(hass):
+        breaker = CircuitBreaker("test")
+        fetcher = HistoryFetcher(hass, None, breaker)
+        results = await asyncio.gather(
+            fetcher.async_get_consumption("a", 48),
+            fetcher.async_get_consumption("broken", 48),
+            fetcher.async_get_production("a", 48),
+            return_exceptions=True,
+        )
+        return results, breaker.failures
+
+    results, failures = run_in_hass(_test)
+    assert len(batches) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert failures == 1
@@ -0,0 +1,111 @@
+"""Tests of the consumption history store."""
+import datetime
+import json
+
+from homeassistant.util import dt as dt_util
+
+from custom_components.tibber_data.consumption_data import ConsumptionNode
+from custom_components.tibber_data.history_store import ConsumptionHistoryStore
+
+from .common import local_time
+
+
+def hourly_nodes(start: datetime.datetime, hours: int) -> list[ConsumptionNode]:
+    """Return nodes of consecutive hours in the default time zone."""
+    start = start.astimezone(datetime.timezone.utc)
+    return [
+        ConsumptionNode(
+            dt_util.as_local(start + datetime.timedelta(hours=k)).isoformat(),
+            1.0 + k,
+            None,
+            None,
+        )
+        for k in range(hours)
+    ]
+
+
+def test_backfilled_hours_are_sorted(run_in_hass):
+    """Hours fetched after newer hours are kept in chronological order."""
+    # Across the end of DST, where the UTC offset of the hours changes
+    nodes = hourly_nodes(local_time((2023, 10, 28, 20, 0)), 12)
+    gaps = [nodes[0], nodes[5], nodes[7]]
+
+    async def _test(hass):
+        store = ConsumptionHistoryStore(hass, "test")
+        store.merge([node for node in nodes if node not in gaps])
+        assert store.merge(gaps) == gaps
+        assert store.nodes == nodes
+        assert store.oldest_start() == nodes[0].start
+        assert list(store.iter_nodes_newest_first()) == nodes[::-1]
+        assert store.last_complete_hour() == dt_util.parse_datetime(nodes[-1].start)
+
+    run_in_hass(_test)
+
+
+def test_oldest_hours_are_dropped(run_in_hass):
+    """The oldest hours are dropped beyond the maximum, also after a backfill."""
+    nodes = hourly_nodes(local_time((2024, 1, 1, 0, 0)), 10)
+
+    async def _test(hass):
+        store = ConsumptionHistoryStore(hass, "test", max_hours=6)
+        store.merge(nodes[4:])
+        store.merge(nodes[:4])
+        assert store.nodes == nodes[4:]
+
+    run_in_hass(_test)
+
+
+def test_stored_hours_survive_restart(run_in_hass):
+    """The merged hours are saved and loaded again after a restart."""
+    nodes = hourly_nodes(local_time((2024, 1, 1, 0, 0)), 10)
+
+    async def _merge(hass):
+        store = ConsumptionHistoryStore(hass, "test")
+        await store.async_load()
+        store.merge(nodes[5:])
+        store.merge(nodes[:5])
+
+    async def _load(hass):
+        store = ConsumptionHistoryStore(hass, "test")
+        await store.async_load()
+        return store
+
+    run_in_hass(_merge)
+    store = run_in_hass(_load)
+    assert store.nodes == nodes
+    assert store.revision == 1
+    assert store.hours_to_fetch(local_time((2024, 1, 1, 12, 30))) == 52
+
+
+def test_version_1_store_is_migrated(run_in_hass, tmp_path):
+    """Nodes stored as API dicts by version 1 are loaded as ConsumptionNode."""
+    nodes = hourly_nodes(local_time((2024, 1, 1, 0, 0)), 3)
+    nodes[1] = nodes[1]._replace(consumption=None, cost=1.5, unit_price=0.5)
+    api_nodes = [
+        {
+            "from": node.start,
+            "consumption": node.consumption,
+            "cost": node.cost,
+            "unitPrice": node.unit_price,
+        }
+        for node in nodes
+    ]
+    storage = tmp_path / ".storage"
+    storage.mkdir()
+    (storage / "tibber_data.consumption_test").write_text(
+        json.dumps(
+            {
+                "version": 1,
+                "minor_version": 1,
+                "key": "tibber_data.consumption_test",
+                "data": {"nodes": api_nodes},
+            }
+        )
+    )
+
+    async def _load(hass):
+        store = ConsumptionHistoryStore(hass, "test")
+        await store.async_load()
+        return store
+
+    assert run_in_hass(_load).nodes == nodes
@@ -0,0 +1,66 @@
+"""Tests of the month peak tracker."""
+import random
+
+import pytest
+
+from custom_components.tibber_data.consumption_data import ConsumptionNode
+from custom_components.tibber_data.history_store import ConsumptionHistoryStore
+from custom_components.tibber_data.peak_tracker import MonthPeakTracker
+
+from .common import NOW_TIMES, local_time, make_nodes, rescan_peaks
+
+
+@pytest.mark.parametrize("now_time", NOW_TIMES)
+def test_peaks_match_rescan(now_time):
+    """The tracked peaks match a rescan after new hours and corrections."""
+    now = local_time(now_time)
+    rnd = random.Random(1)
+    nodes = make_nodes(2000, now, rnd)
+    stored, fetched = nodes[:-48], nodes[-48:]
+    # Corrections of stored hours, some lower and some removing the hour
+    for node in rnd.sample(stored[-400:], 40):
+        cons = round(rnd.uniform(0, 8), 3) if rnd.random() > 0.3 else None
+        fetched.append(ConsumptionNode(node.start, cons, None, None))
+    final = {node.start: node for node in stored}
+    final.update((node.start, node) for node in fetched)
+
+    tracker = MonthPeakTracker()
+    tracker.start_month(now, reversed(stored))
+    for node in fetched:
+        tracker.add([node])
+    assert tracker.peaks() == rescan_peaks(final.values(), now)
+
+
+def test_removed_peak_hour():
+    """A peak hour corrected to no consumption is no longer a peak."""
+    now = local_time((2024, 1, 15, 12, 5))
+    starts = [local_time((2024, 1, day, 18, 0)).isoformat() for day in (2, 3, 4, 5)]
+
+    tracker = MonthPeakTracker()
+    tracker.start_month(now, [])
+    tracker.add(
+        ConsumptionNode(start, 5.0 + k, None, None) for k, start in enumerate(starts)
+    )
+    assert tracker.stats()["peak_consumption"] == 7.0
+    assert tracker.add([ConsumptionNode(starts[3], None, None, None)])
+    assert tracker.peaks() == [(7.0, starts[2]), (6.0, starts[1]), (5.0, starts[0])]
+    assert tracker.stats()["peak_consumption"] == 6.0
+
+
+def test_peaks_after_restart(run_in_hass):
+    """After a restart the tracker is seeded with the same peaks from the history."""
+    now = local_time((2024, 1, 15, 12, 5))
+    nodes = make_nodes(2000, now, random.Random(3))
+
+    async def _track(hass):
+        # As the coordinator does on each start
+        store = ConsumptionHistoryStore(hass, "test")
+        await store.async_load()
+        tracker = MonthPeakTracker()
+        tracker.start_month(now, store.iter_nodes_newest_first())
+        tracker.add(store.merge(nodes))
+        return tracker.stats()
+
+    before = run_in_hass(_track)
+    assert before["peak_consumption"] is not None
+    assert run_in_hass(_track) == before
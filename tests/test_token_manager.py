@@ -0,0 +1,86 @@
+"""Tests of the token manager."""
+import asyncio
+import base64
+import datetime
+import json
+
+import pytest
+from homeassistant.util import dt as dt_util
+
+from custom_components.tibber_data import token_manager
+from custom_components.tibber_data.token_manager import (
+    REFRESH_MARGIN,
+    TibberTokenManager,
+)
+
+
+def make_token(expires_in: datetime.timedelta, name: str) -> str:
+    """Return a JWT token expiring after a time."""
+    exp = int((dt_util.utcnow() + expires_in).timestamp())
+    payload = base64.urlsafe_b64encode(json.dumps({"exp": exp, "n": name}).encode())
+    return f"header.{payload.decode().rstrip('=')}.signature"
+
+
+@pytest.fixture
+def logins(monkeypatch):
+    """Replace the login with one handing out queued tokens."""
+    tokens: list[str] = []
+    calls: list[str] = []
+
+    async def _get_tibber_token(_session, email, _password):
+        calls.append(email)
+        await asyncio.sleep(0.01)
+        return tokens.pop(0)
+
+    monkeypatch.setattr(token_manager, "get_tibber_token", _get_tibber_token)
+    return tokens, calls
+
+
+def test_concurrent_requests_log_in_once(run_in_hass, logins):
+    """Homes asking for a token at the same time share one login."""
+    tokens, calls = logins
+    token = make_token(datetime.timedelta(hours=1), "a")
+    tokens.append(token)
+
+    async def _test(hass):
+        manager = TibberTokenManager(hass, None, "user@example.com", "secret")
+        return await asyncio.gather(*(manager.async_get_token() for _ in range(5)))
+
+    assert run_in_hass(_test) == [token] * 5
+    assert calls == ["user@example.com"]
+
+
+def test_token_is_refreshed_before_expiry(run_in_hass, logins):
+    """A token is replaced once it expires within the refresh margin."""
+    tokens, calls = logins
+    expiring = make_token(REFRESH_MARGIN - datetime.timedelta(minutes=1), "a")
+    fresh = make_token(REFRESH_MARGIN + datetime.timedelta(hours=1), "b")
+    tokens.extend([expiring, fresh])
+
+    async def _test(hass):
+        manager = TibberTokenManager(hass, None, "user@example.com", "secret")
+        return [await manager.async_get_token() for _ in range(3)]
+
+    assert run_in_hass(_test) == [expiring, fresh, fresh]
+    assert len(calls) == 2
+
+
+def test_invalidate_ignores_a_stale_token(run_in_hass, logins):
+    """Only the rejection of the current token drops it."""
+    tokens, calls = logins
+    first = make_token(datetime.timedelta(hours=1), "a")
+    second = make_token(datetime.timedelta(hours=1), "b")
+    tokens.extend([first, second])
+
+    async def _test(hass):
+        manager = TibberTokenManager(hass, None, "user@example.com", "secret")
+        assert await manager.async_get_token() == first
+        manager.invalidate(first)
+        assert await manager.async_get_token() == second
+        # A home still holding the first token reports it after the refresh
+        manager.invalidate(first)
+        assert manager.token == second
+        assert await manager.async_get_token() == second
+
+    run_in_hass(_test)
+    assert len(calls) == 2